@@ -0,0 +1,232 @@
+import typing
+import concurrent.futures
+import threading
+import gzip
+import time
+import uuid
+import os
+
+from .KSGraphModel import KSGraph, KSNode
+from .KSJsonStream import writeJsonItems
+
+AUTOSAVE_SUFFIX = ".json.gz"
+AUTOSAVE_SESSION_SUFFIX = ".session"
+
+def parseAutosaveFilename(filename: str) -> typing.Optional[typing.Tuple[str, str, int]]:
+    """ Returns (name, session, timestamp) of a "<name>.autosave.<session>.<timestamp>.json.gz" filename, or None. """
+    if (not filename.endswith(AUTOSAVE_SUFFIX)):
+        return None
+
+    # The name may contain dots itself (e.g. "graph.json"), so split from the right.
+    parts = filename[:-len(AUTOSAVE_SUFFIX)].rsplit(".", 3)
+    if (len(parts) != 4 or parts[1] != "autosave" or not parts[2].isalnum() or not parts[3].isdigit()):
+        return None
+    return parts[0], parts[2], int(parts[3])
+
+class KSGraphAutosaver(object):
+    """
+    Periodic crash recovery saves of a graph. snapshot() copies the serialized node state on the calling (main)
+    thread, reusing the data of nodes that didn't change since the previous snapshot; JSON serialization, gzip
+    compression and the atomic file replace then run on a worker thread.
+
+    Several sessions (processes) may share the autosave directory. Every session keeps a "<session>.session" file
+    whose modification time is refreshed on each autosave() call; sessions that stopped refreshing it for longer than
+    the session timeout are over (closed or crashed), and their autosaves are what recoverableAutosaves() lists.
+    A session keeps its own newest autosaves; autosaves of sessions that are over are kept per graph name up to the
+    retention count and the maximum age. Autosaves of other live sessions are never touched.
+    """
+    _graph: KSGraph = None
+    _directory: str = None
+    _name: str = None
+    _session: str = None
+    _retentionCount: int = None
+    _sessionTimeout: float = None
+    _maximumAge: float = None
+
+    _worker: concurrent.futures.ThreadPoolExecutor = None
+    _pending: concurrent.futures.Future = None
+    _lock: threading.Lock = None
+
+    # Node -> (revision, serialized node), see KSNode.revision(). Keyed by the node itself rather than its UUID, as
+    # revisions restart for the new node instances of a reopened file.
+    _serializedNodes: typing.Dict[KSNode, typing.Tuple[int, object]] = None
+    _snapshotRevisions: typing.Dict[KSNode, int] = None
+
+    def __init__(self, graph: KSGraph, directory: str, name: str = "untitled", retentionCount: int = 5, sessionTimeout: float = 10 * 60, maximumAge: float = 7 * 24 * 60 * 60) -> None:
+        self._graph = graph
+        self._directory = directory
+        self._name = name
+        self._session = uuid.uuid4().hex[:12]
+        self._retentionCount = retentionCount
+        self._sessionTimeout = sessionTimeout
+        self._maximumAge = maximumAge
+        self._worker = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="KSGraphAutosaver")
+        self._lock = threading.Lock()
+        self._serializedNodes = {}
+
+    def directory(self) -> str:
+        return self._directory
+
+    def setDirectory(self, directory: str) -> None:
+        self._directory = directory
+
+    def name(self) -> str:
+        return self._name
+
+    def setName(self, name: str) -> None:
+        self._name = name
+
+    def session(self) -> str:
+        return self._session
+
+    def retentionCount(self) -> int:
+        return self._retentionCount
+
+    def setRetentionCount(self, retentionCount: int) -> None:
+        self._retentionCount = retentionCount
+
+    def sessionTimeout(self) -> float:
+        return self._sessionTimeout
+
+    def setSessionTimeout(self, sessionTimeout: float) -> None:
+        """ Seconds without autosave() calls after which a session counts as over, keep it well above the autosave interval. """
+        self._sessionTimeout = sessionTimeout
+
+    def maximumAge(self) -> float:
+        return self._maximumAge
+
+    def setMaximumAge(self, maximumAge: float) -> None:
+        """ Seconds after which autosaves of sessions that are over are removed. """
+        self._maximumAge = maximumAge
+
+    def isSaving(self) -> bool:
+        return self._pending != None and not self._pending.done()
+
+    def wait(self) -> None:
+        if (self._pending != None):
+            self._pending.result()
+
+    # region Sessions
+    def sessionFilepath(self, session: str) -> str:
+        return os.path.join(self._directory, session + AUTOSAVE_SESSION_SUFFIX)
+
+    def heartbeat(self) -> None:
+        """ Marks this session as live. """
+        os.makedirs(self._directory, exist_ok=True)
+        with open(self.sessionFilepath(self._session), "a"):
+            pass
+        os.utime(self.sessionFilepath(self._session))
+
+    def isSessionLive(self, session: str) -> bool:
+        if (session == self._session):
+            return True
+        try:
+            return time.time() - os.path.getmtime(self.sessionFilepath(session)) < self._sessionTimeout
+        except OSError:
+            return False
+
+    def close(self) -> None:
+        """ Ends this session on a clean shutdown, its autosaves stay recoverable until they're pruned. """
+        self.wait()
+        if (os.path.isfile(self.sessionFilepath(self._session))):
+            os.remove(self.sessionFilepath(self._session))
+    # endregion
+
+    def snapshot(self) -> typing.Optional[typing.List[object]]:
+        """ Returns the serialized nodes, or None when nothing changed since the previous snapshot. Main thread only. """
+        serializedNodes = {}
+        revisions = {}
+        for node in self._graph.nodes():
+            serializedNode = self._serializedNodes.get(node, None)
+            if (serializedNode == None or serializedNode[0] != node.revision()):
+                serializedNode = (node.revision(), node.serialize())
+            serializedNodes[node] = serializedNode
+            revisions[node] = serializedNode[0]
+
+        # Serialized nodes are never modified once created, so the worker can use them while the graph is edited.
+        self._serializedNodes = serializedNodes
+        if (revisions == self._snapshotRevisions):
+            return None
+        self._snapshotRevisions = revisions
+        return [serializedNode[1] for serializedNode in serializedNodes.values()]
+
+    def autosave(self) -> bool:
+        """ Starts an autosave unless one is still running or the graph didn't change, returns whether it started. """
+        self.heartbeat()
+        if (self.isSaving()):
+            return False
+
+        items = self.snapshot()
+        if (items == None):
+            return False
+
+        filepath = os.path.join(self._directory, f"{self._name}.autosave.{self._session}.{int(time.time() * 1000)}{AUTOSAVE_SUFFIX}")
+        self._pending = self._worker.submit(self.write, filepath, items)
+        return True
+
+    def write(self, filepath: str, items: typing.List[object]) -> None:
+        with self._lock:
+            os.makedirs(self._directory, exist_ok=True)
+
+            temporaryPath = filepath + ".tmp"
+            with gzip.open(temporaryPath, "wt", compresslevel=6) as file:
+                writeJsonItems(file, items)
+            os.replace(temporaryPath, filepath)
+
+            self.prune()
+
+    def prune(self) -> None:
+        """ Removes the autosaves exceeding the retention count or maximum age, see the class description. """
+        ownAutosaves = []
+        endedAutosaves = {}
+        for name, session, timestamp, filepath in self.listAutosaves():
+            if (session == self._session):
+                # Across names too, so autosaves under a name from before a Save As don't pile up.
+                ownAutosaves.append(filepath)
+            elif (not self.isSessionLive(session)):
+                endedAutosaves.setdefault(name, []).append((timestamp, filepath))
+
+        removeFilepaths = ownAutosaves[self._retentionCount:]
+        oldest = (time.time() - self._maximumAge) * 1000
+        for autosaves in endedAutosaves.values():
+            for index, (timestamp, filepath) in enumerate(autosaves):
+                if (index >= self._retentionCount or timestamp < oldest):
+                    removeFilepaths.append(filepath)
+
+        for filepath in removeFilepaths:
+            try:
+                os.remove(filepath)
+            except OSError as error:
+                print(f"ERROR: Failed to remove autosave '{filepath}': {error}")
+
+        # Session files of sessions that are over and have no autosaves left.
+        remainingSessions = set([session for _, session, _, _ in self.listAutosaves()])
+        for filename in os.listdir(self._directory):
+            session = filename[:-len(AUTOSAVE_SESSION_SUFFIX)]
+            if (filename.endswith(AUTOSAVE_SESSION_SUFFIX) and session not in remainingSessions and not self.isSessionLive(session)):
+                os.remove(os.path.join(self._directory, filename))
+
+    def listAutosaves(self) -> typing.List[typing.Tuple[str, str, int, str]]:
+        """ Returns (name, session, timestamp, filepath) of every autosave in the directory, newest first. """
+        if (not os.path.isdir(self._directory)):
+            return []
+
+        autosaves = []
+        for filename in os.listdir(self._directory):
+            parsed = parseAutosaveFilename(filename)
+            if (parsed != None):
+                autosaves.append(parsed + (os.path.join(self._directory, filename),))
+        return sorted(autosaves, key=lambda autosave: autosave[2], reverse=True)
+
+    def autosaves(self) -> typing.List[str]:
+        """ Returns this session's autosave files of the current name, newest first. """
+        return [filepath for name, session, _, filepath in self.listAutosaves() if name == self._name and session == self._session]
+
+    def recoverableAutosaves(self, name: str = None) -> typing.List[str]:
+        """ Returns the autosave files left by sessions that are over (e.g. crashed), of the given name if any, newest first. """
+        return [filepath for autosaveName, session, _, filepath in self.listAutosaves() if (name == None or autosaveName == name) and not self.isSessionLive(session)]
+
+    @staticmethod
+    def load(graph: KSGraph, filepath: str) -> typing.List[KSNode]:
+        with gzip.open(filepath, "rt") as file:
+            return graph.deserializeFromFile(file)
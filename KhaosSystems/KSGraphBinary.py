@@ -0,0 +1,240 @@
+import typing
+import struct
+import mmap
+import json
+
+from .KSJsonStream import KSJsonItemStreamReader, writeJsonItems
+
+# Binary graph file layout (little endian), holding the same data as the {'items': [...]} JSON:
+#   header       | see BINARY_GRAPH_HEADER
+#   string table | u32 offsets (stringCount + 1) followed by the UTF-8 string data; every string is stored once
+#   node table   | nodeCount fixed width BINARY_GRAPH_NODE_RECORDs
+#   input table  | inputCount fixed width BINARY_GRAPH_INPUT_RECORDs, grouped per node
+# Nodes reference each other by their index in the node table. "NODE_<int>" UUIDs are stored as a 128 bit integer,
+# anything else goes to the string table. Manual input data is stored as a JSON string.
+BINARY_GRAPH_EXTENSION = ".ksg"
+BINARY_GRAPH_MAGIC = b"KSGB"
+BINARY_GRAPH_VERSION = 1
+
+# magic, version, reserved, string count, node count, input count, string offsets, string data, node table, input table
+BINARY_GRAPH_HEADER = struct.Struct("<4sHHIIIQQQQ")
+# type identifier string, flags, UUID high, UUID low, x, y, first input, input count
+BINARY_GRAPH_NODE_RECORD = struct.Struct("<IIQQddII")
+# input key string, flags, provider node (or provider UUID string), provider output key string, manual data string
+BINARY_GRAPH_INPUT_RECORD = struct.Struct("<IIIII")
+
+BINARY_GRAPH_NODE_FLAG_STRING_UUID = 1
+# Positions are stored as doubles, these mark the coordinates that were ints so JSON round trips keep them ints.
+BINARY_GRAPH_NODE_FLAG_INT_X = 2
+BINARY_GRAPH_NODE_FLAG_INT_Y = 4
+BINARY_GRAPH_INPUT_FLAG_UNRESOLVED_PROVIDER = 1
+
+UUID_PREFIX = "NODE_"
+
+def isBinaryGraphFile(filepath: str) -> bool:
+    return filepath.lower().endswith(BINARY_GRAPH_EXTENSION)
+
+class KSGraphBinaryWriter(object):
+    _strings: typing.Dict[str, int] = None
+    _stringList: typing.List[str] = None
+
+    def __init__(self) -> None:
+        self._strings = {}
+        self._stringList = []
+
+    def intern(self, string: str) -> int:
+        index = self._strings.get(string, None)
+        if (index == None):
+            index = len(self._stringList)
+            self._strings[string] = index
+            self._stringList.append(string)
+        return index
+
+    @staticmethod
+    def packUniqueIdentifier(uniqueIdentifier: str) -> typing.Optional[int]:
+        """ Returns the integer part of a "NODE_<int>" UUID, if it round trips exactly. """
+        if (not uniqueIdentifier.startswith(UUID_PREFIX)):
+            return None
+        digits = uniqueIdentifier[len(UUID_PREFIX):]
+        if (not digits.isdigit() or not digits.isascii() or str(int(digits)) != digits or int(digits) >= 1 << 128):
+            return None
+        return int(digits)
+
+    def write(self, file: typing.BinaryIO, items: typing.List[object]) -> None:
+        nodeIndices = { items[index]['UUID']:index for index in range(len(items)) }
+
+        nodeTable = bytearray(BINARY_GRAPH_NODE_RECORD.size * len(items))
+        inputTable = bytearray()
+        inputCount = 0
+        for index, itemData in enumerate(items):
+            flags = 0
+            uniqueIdentifier = self.packUniqueIdentifier(itemData['UUID'])
+            if (uniqueIdentifier == None):
+                flags |= BINARY_GRAPH_NODE_FLAG_STRING_UUID
+                uniqueIdentifier = self.intern(itemData['UUID'])
+
+            x, y = itemData['position'][0], itemData['position'][1]
+            if (isinstance(x, int) and abs(x) <= 1 << 53):
+                flags |= BINARY_GRAPH_NODE_FLAG_INT_X
+            if (isinstance(y, int) and abs(y) <= 1 << 53):
+                flags |= BINARY_GRAPH_NODE_FLAG_INT_Y
+
+            inputs = itemData['inputs']
+            BINARY_GRAPH_NODE_RECORD.pack_into(nodeTable, index * BINARY_GRAPH_NODE_RECORD.size,
+                self.intern(itemData['typeIdentifier']), flags, uniqueIdentifier >> 64, uniqueIdentifier & 0xFFFFFFFFFFFFFFFF,
+                x, y, inputCount, len(inputs))
+
+            for inputKey in inputs:
+                inputData = inputs[inputKey]
+                inputFlags = 0
+                provider = nodeIndices.get(inputData['connectionUUID'], None) if inputData['connectionUUID'] != "" else None
+                if (provider == None):
+                    inputFlags |= BINARY_GRAPH_INPUT_FLAG_UNRESOLVED_PROVIDER
+                    provider = self.intern(inputData['connectionUUID'])
+
+                inputTable += BINARY_GRAPH_INPUT_RECORD.pack(self.intern(inputKey), inputFlags, provider,
+                    self.intern(inputData['connectionOutputKey']), self.intern(json.dumps(inputData['manualInputData'])))
+                inputCount += 1
+
+        stringData = bytearray()
+        stringOffsets = bytearray()
+        for string in self._stringList:
+            stringOffsets += struct.pack("<I", len(stringData))
+            stringData += string.encode("utf-8")
+        stringOffsets += struct.pack("<I", len(stringData))
+
+        stringOffsetsOffset = BINARY_GRAPH_HEADER.size
+        stringDataOffset = stringOffsetsOffset + len(stringOffsets)
+        # Keep the fixed width tables 8 byte aligned.
+        nodeTableOffset = (stringDataOffset + len(stringData) + 7) & ~7
+        inputTableOffset = nodeTableOffset + len(nodeTable)
+
+        file.write(BINARY_GRAPH_HEADER.pack(BINARY_GRAPH_MAGIC, BINARY_GRAPH_VERSION, 0, len(self._stringList), len(items), inputCount,
+            stringOffsetsOffset, stringDataOffset, nodeTableOffset, inputTableOffset))
+        file.write(stringOffsets)
+        file.write(stringData)
+        file.write(bytes(nodeTableOffset - (stringDataOffset + len(stringData))))
+        file.write(nodeTable)
+        file.write(inputTable)
+
+class KSGraphBinaryReader(object):
+    """ Reads a binary graph file through mmap, records and strings are only decoded when they are accessed. """
+    _mmap: mmap.mmap = None
+    _stringCount: int = None
+    _nodeCount: int = None
+    _inputCount: int = None
+    _stringOffsetsOffset: int = None
+    _stringDataOffset: int = None
+    _nodeTableOffset: int = None
+    _inputTableOffset: int = None
+    _strings: typing.List[str] = None
+    _manualData: typing.Dict[int, typing.Any] = None
+
+    def __init__(self, file: typing.BinaryIO) -> None:
+        self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, self._stringCount, self._nodeCount, self._inputCount, self._stringOffsetsOffset, self._stringDataOffset, self._nodeTableOffset, self._inputTableOffset = BINARY_GRAPH_HEADER.unpack_from(self._mmap, 0)
+        if (magic != BINARY_GRAPH_MAGIC or version != BINARY_GRAPH_VERSION):
+            self.close()
+            raise ValueError(f"Not a binary graph file (version {BINARY_GRAPH_VERSION}).")
+
+        self._strings = [None] * self._stringCount
+        self._manualData = {}
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self) -> "KSGraphBinaryReader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def nodeCount(self) -> int:
+        return self._nodeCount
+
+    def string(self, index: int) -> str:
+        string = self._strings[index]
+        if (string == None):
+            start, end = struct.unpack_from("<II", self._mmap, self._stringOffsetsOffset + index * 4)
+            string = str(self._mmap[self._stringDataOffset + start:self._stringDataOffset + end], "utf-8")
+            self._strings[index] = string
+        return string
+
+    def nodeRecord(self, index: int) -> typing.Tuple:
+        return BINARY_GRAPH_NODE_RECORD.unpack_from(self._mmap, self._nodeTableOffset + index * BINARY_GRAPH_NODE_RECORD.size)
+
+    def node(self, index: int) -> typing.Tuple[str, str, typing.Tuple[float, float]]:
+        """ Returns (typeIdentifier, UUID, position) of the node, decoding its record once. """
+        typeIdentifier, flags, uuidHigh, uuidLow, x, y, _, _ = self.nodeRecord(index)
+        if (flags & BINARY_GRAPH_NODE_FLAG_STRING_UUID):
+            uniqueIdentifier = self.string(uuidLow)
+        else:
+            uniqueIdentifier = UUID_PREFIX + str((uuidHigh << 64) | uuidLow)
+        if (flags & BINARY_GRAPH_NODE_FLAG_INT_X):
+            x = int(x)
+        if (flags & BINARY_GRAPH_NODE_FLAG_INT_Y):
+            y = int(y)
+        return self.string(typeIdentifier), uniqueIdentifier, (x, y)
+
+    def typeIdentifier(self, index: int) -> str:
+        return self.node(index)[0]
+
+    def uniqueIdentifier(self, index: int) -> str:
+        return self.node(index)[1]
+
+    def position(self, index: int) -> typing.Tuple[float, float]:
+        return self.node(index)[2]
+
+    def manualData(self, index: int) -> typing.Any:
+        # Most manual input data are shared immutable values (e.g. the same string on many nodes), only decode those once.
+        data = self._manualData.get(index, self._manualData)
+        if (data is self._manualData):
+            data = json.loads(self.string(index))
+            if (not isinstance(data, (str, int, float, bool, type(None)))):
+                return data
+            self._manualData[index] = data
+        return data
+
+    def inputs(self, index: int) -> typing.Iterator[typing.Tuple[str, typing.Optional[int], typing.Optional[str], str, typing.Any]]:
+        """
+        Yields (inputKey, providerNodeIndex, providerUUID, providerOutputKey, manualInputData) per input of the node.
+        Providers stored in the file are referenced by node index, only other providers by UUID ("" when unconnected).
+        """
+        _, _, _, _, _, _, firstInput, inputCount = self.nodeRecord(index)
+        for inputIndex in range(firstInput, firstInput + inputCount):
+            key, flags, provider, outputKey, manualData = BINARY_GRAPH_INPUT_RECORD.unpack_from(self._mmap, self._inputTableOffset + inputIndex * BINARY_GRAPH_INPUT_RECORD.size)
+            if (flags & BINARY_GRAPH_INPUT_FLAG_UNRESOLVED_PROVIDER):
+                yield self.string(key), None, self.string(provider), self.string(outputKey), self.manualData(manualData)
+            else:
+                yield self.string(key), provider, None, self.string(outputKey), self.manualData(manualData)
+
+    def item(self, index: int) -> object:
+        """ Returns the node in the same form as KSNode.serialize(). """
+        typeIdentifier, uniqueIdentifier, position = self.node(index)
+        return {
+            'typeIdentifier': typeIdentifier,
+            'UUID': uniqueIdentifier,
+            'position': list(position),
+            'inputs': { inputKey:{
+                'manualInputData': manualData,
+                'connectionUUID': providerUUID if providerIndex == None else self.uniqueIdentifier(providerIndex),
+                'connectionOutputKey': outputKey
+                } for inputKey, providerIndex, providerUUID, outputKey, manualData in self.inputs(index) }
+        }
+
+    def items(self) -> typing.Iterator[object]:
+        for index in range(self._nodeCount):
+            yield self.item(index)
+
+def convertJsonToBinary(jsonFilepath: str, binaryFilepath: str) -> None:
+    with open(jsonFilepath) as file:
+        items = list(KSJsonItemStreamReader(file, 'items').items())
+
+    with open(binaryFilepath, "wb") as file:
+        KSGraphBinaryWriter().write(file, items)
+
+def convertBinaryToJson(binaryFilepath: str, jsonFilepath: str) -> None:
+    with open(binaryFilepath, "rb") as binaryFile, open(jsonFilepath, "w") as jsonFile:
+        with KSGraphBinaryReader(binaryFile) as reader:
+            writeJsonItems(jsonFile, reader.items())
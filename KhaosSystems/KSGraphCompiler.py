@@ -0,0 +1,144 @@
+import typing
+import asyncio
+
+from .KSGraphModel import KSGraph
+from .KSGraphExecutor import KSGraphExecutionPlan
+
+def compiledNodeType(nodeType: type) -> type:
+    """ Derives a node type whose getInputData()/setOutputData() use plain dictionaries filled by the compiled graph, instead of ports. """
+    compiledType = nodeType.__dict__.get('_compiledNodeType', None)
+    if (compiledType == None):
+        def getInputData(self, inputKey: str) -> typing.Any:
+            return self._compiledInputs[inputKey]
+
+        def setOutputData(self, outputKey: str, data: typing.Any) -> None:
+            self._compiledOutputs[outputKey] = data
+
+        compiledType = type(nodeType.__name__, (nodeType,), {
+            '__module__': nodeType.__module__,
+            '_compiledInputs': None,
+            '_compiledOutputs': None,
+            'getInputData': getInputData,
+            'setOutputData': setOutputData
+        })
+        nodeType._compiledNodeType = compiledType
+    return compiledType
+
+class KSCompiledGraph(object):
+    """
+    A graph flattened into a single generated Python function; connections are local variables and manual input
+    data are constants, so executing it skips the port lookups of interpreted execution.
+    """
+    _source: str = None
+    _function: typing.Callable = None
+    _constants: typing.List[typing.Any] = None
+    _constantIndices: typing.Dict[typing.Tuple[str, str], int] = None
+
+    def __init__(self, source: str, function: typing.Callable, constants: typing.List[typing.Any], constantIndices: typing.Dict[typing.Tuple[str, str], int]) -> None:
+        self._source = source
+        self._function = function
+        self._constants = constants
+        self._constantIndices = constantIndices
+
+    def source(self) -> str:
+        return self._source
+
+    def __call__(self, overrides: typing.Dict[str, typing.Dict[str, typing.Any]] = None) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """
+        Executes the graph, overrides map node UUIDs to {inputKey: value} replacements of manual input data.
+        Returns {nodeUUID: {outputKey: value}}, or None when a node failed.
+        """
+        constants = self._constants
+        if (overrides != None):
+            constants = list(constants)
+            for uniqueIdentifier in overrides:
+                for inputKey in overrides[uniqueIdentifier]:
+                    index = self._constantIndices.get((uniqueIdentifier, inputKey), None)
+                    if (index == None):
+                        print(f"ERROR: Can't override input '{inputKey}' of node {uniqueIdentifier}, it doesn't exist or isn't using manual input data.")
+                        continue
+                    constants[index] = overrides[uniqueIdentifier][inputKey]
+
+        return self._function(constants)
+
+class KSGraphCompiler(object):
+    _graph: KSGraph = None
+
+    def __init__(self, graph: KSGraph) -> None:
+        self._graph = graph
+
+    @staticmethod
+    def compileJson(jsonStr: str, nodeTypes: typing.List[type]) -> KSCompiledGraph:
+        """ Compiles a graph saved by serializeToJson(). """
+        graph = KSGraph()
+        for nodeType in nodeTypes:
+            graph.addNodeType(nodeType)
+        graph.deserializeFromJson(jsonStr)
+
+        return KSGraphCompiler(graph).compile()
+
+    def compile(self) -> KSCompiledGraph:
+        plan = KSGraphExecutionPlan(self._graph.nodes())
+        if (not plan.isValid()):
+            print("ERROR: Failed to compile the graph, it contains a cycle.")
+            return None
+
+        nodes = plan.order()
+        nodeIndices = { node:index for index, node in enumerate(nodes) }
+        constants = []
+        constantIndices = {}
+        namespace = { '_run': asyncio.run, '_nodes': [], '_returnTypes': [], '_fail': self.onNodeFailed }
+
+        lines = ["def compiledGraph(k):"]
+        for nodeIndex, node in enumerate(nodes):
+            bindingPlan = node.bindingPlan()
+            if (not bindingPlan.isValid()):
+                print(f"ERROR: Failed to compile node '{node.title()}' ({node.uniqueIdentifier()}): {bindingPlan.error()}")
+                return None
+
+            compiledNode = compiledNodeType(type(node))()
+            compiledNode._uniqueIdentifier = node.uniqueIdentifier()
+            namespace['_nodes'].append(compiledNode)
+            namespace['_returnTypes'].append(bindingPlan.returnType())
+
+            # Resolve every input to a local variable or a constant.
+            inputValues = {}
+            for inputKey, port in node.inputs().items():
+                connection = port.connection()
+                if (connection != None):
+                    inputValues[inputKey] = f"v{nodeIndices[connection.node()]}_{list(connection.node().outputs()).index(connection.key())}"
+                else:
+                    constantIndices[(node.uniqueIdentifier(), inputKey)] = len(constants)
+                    inputValues[inputKey] = f"k[{len(constants)}]"
+                    constants.append(port.manualData())
+
+            lines.append(f"    # {node.typeIdentifier()} {node.uniqueIdentifier()}")
+            lines.append(f"    n = _nodes[{nodeIndex}]")
+            lines.append(f"    o = n._compiledOutputs = {{}}")
+            lines.append(f"    n._compiledInputs = {{{', '.join(f'{repr(key)}: {value}' for key, value in inputValues.items())}}}")
+            lines.append(f"    r = n.execute({', '.join(inputValues[key] for key in bindingPlan.argumentKeys())})")
+            if (bindingPlan.isCoroutine()):
+                lines.append(f"    r = _run(r)")
+            if (bindingPlan.returnType() != None):
+                lines.append(f"    if type(r) is not _returnTypes[{nodeIndex}]: return _fail({nodeIndex})")
+            for outputIndex, outputKey in enumerate(node.outputs()):
+                if (outputKey == 'return' and bindingPlan.returnType() != None):
+                    lines.append(f"    v{nodeIndex}_{outputIndex} = r")
+                else:
+                    lines.append(f"    v{nodeIndex}_{outputIndex} = o.get({repr(outputKey)})")
+
+        results = []
+        for nodeIndex, node in enumerate(nodes):
+            outputs = ', '.join(f"{repr(outputKey)}: v{nodeIndex}_{outputIndex}" for outputIndex, outputKey in enumerate(node.outputs()))
+            results.append(f"{repr(node.uniqueIdentifier())}: {{{outputs}}}")
+        lines.append(f"    return {{{', '.join(results)}}}")
+
+        source = "\n".join(lines) + "\n"
+        exec(compile(source, "<KSCompiledGraph>", "exec"), namespace)
+        return KSCompiledGraph(source, namespace['compiledGraph'], constants, constantIndices)
+
+    @staticmethod
+    def onNodeFailed(nodeIndex: int) -> None:
+        print("ERROR: The data returned by execute() did not match with the specified return type!")
+        print(f"ERROR: Execution of the compiled graph stopped at node index {nodeIndex}.")
+        return None
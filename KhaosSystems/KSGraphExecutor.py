@@ -0,0 +1,442 @@
+import typing
+import collections
+import concurrent.futures
+import asyncio
+import time
+
+from .KSGraphModel import KSGraph, KSNode
+from .KSNodeCache import KSNodeResultCache
+from .KSGraphProfiler import KSGraphProfiler
+
+class KSGraphExecutionPlan(object):
+    """ Dependency ordered list of nodes, built once from the input->output connections. """
+    _order: typing.List[KSNode] = None
+    _cycle: typing.List[KSNode] = None
+
+    def __init__(self, nodes: typing.List[KSNode]) -> None:
+        self._order = []
+        self._cycle = []
+
+        # Kahn's algorithm, only edges between the planned nodes are taken into account.
+        nodeSet = set(nodes)
+        inDegree = {}
+        for node in nodes:
+            inDegree[node] = len([upstreamNode for upstreamNode in node.upstreamNodes() if upstreamNode in nodeSet])
+
+        readyNodes = collections.deque([node for node in nodes if inDegree[node] == 0])
+        while (len(readyNodes) > 0):
+            node = readyNodes.popleft()
+            self._order.append(node)
+            for downstreamNode in node.downstreamNodes():
+                if (downstreamNode not in nodeSet):
+                    continue
+                inDegree[downstreamNode] -= 1
+                if (inDegree[downstreamNode] == 0):
+                    readyNodes.append(downstreamNode)
+
+        if (len(self._order) != len(nodes)):
+            self._cycle = self.findCycle([node for node in nodes if inDegree[node] > 0])
+
+    @staticmethod
+    def findCycle(remainingNodes: typing.List[KSNode]) -> typing.List[KSNode]:
+        # Every remaining node has at least one remaining upstream node, so walking upstream must eventually revisit a node.
+        remainingSet = set(remainingNodes)
+        path = []
+        visited = {}
+        node = remainingNodes[0]
+        while (node not in visited):
+            visited[node] = len(path)
+            path.append(node)
+            node = [upstreamNode for upstreamNode in node.upstreamNodes() if upstreamNode in remainingSet][0]
+
+        cycle = path[visited[node]:]
+        cycle.reverse()
+        return cycle
+
+    def order(self) -> typing.List[KSNode]:
+        return self._order
+
+    def cycle(self) -> typing.List[KSNode]:
+        return self._cycle
+
+    def isValid(self) -> bool:
+        return len(self._cycle) == 0
+
+def executeDetachedNode(nodeType: type, inputData: typing.Dict[str, typing.Any]) -> typing.Tuple[bool, typing.Dict[str, typing.Any], float, float]:
+    """
+    Runs a fresh, unconnected instance of a pure node type; used to execute nodes inside worker processes.
+    Returns the success, the output data and the wall and CPU time the execution took.
+    """
+    node = nodeType()
+    for inputKey in inputData:
+        node._inputs[inputKey]._manualData = inputData[inputKey]
+
+    wallStart, cpuStart = time.perf_counter(), time.thread_time()
+    success = node.executeImplicit()
+    wallTime, cpuTime = time.perf_counter() - wallStart, time.thread_time() - cpuStart
+    if (not success):
+        return False, {}, wallTime, cpuTime
+
+    return True, { outputKey:node._outputs[outputKey].data() for outputKey in node._outputs }, wallTime, cpuTime
+
+class KSGraphExecutor(object):
+    _graph: KSGraph = None
+    _resultCache: KSNodeResultCache = None
+    _profiler: KSGraphProfiler = None
+
+    def __init__(self, graph: KSGraph, resultCache: KSNodeResultCache = None, profiler: KSGraphProfiler = None) -> None:
+        self._graph = graph
+        self._resultCache = resultCache
+        self._profiler = profiler
+
+    def graph(self) -> KSGraph:
+        return self._graph
+
+    def resultCache(self) -> KSNodeResultCache:
+        return self._resultCache
+
+    def setResultCache(self, resultCache: KSNodeResultCache) -> None:
+        """ Enables memoization of pure node results, pass None to disable it. """
+        self._resultCache = resultCache
+
+    def profiler(self) -> KSGraphProfiler:
+        return self._profiler
+
+    def setProfiler(self, profiler: KSGraphProfiler) -> None:
+        """ Enables recording of per node execution statistics, pass None to disable it. """
+        self._profiler = profiler
+
+    def executeNodeImplicit(self, node: KSNode) -> bool:
+        if (self._profiler == None):
+            return node.executeImplicit()
+        return self._profiler.measure(node, node.executeImplicit)
+
+    async def executeNodeImplicitAsync(self, node: KSNode) -> bool:
+        if (self._profiler == None):
+            return await node.executeImplicitAsync()
+        return await self._profiler.measureAsync(node, node.executeImplicitAsync())
+
+    def buildPlan(self, nodes: typing.List[KSNode] = None) -> KSGraphExecutionPlan:
+        if (nodes == None):
+            nodes = self._graph.nodes()
+
+        plan = KSGraphExecutionPlan(nodes)
+        if (not plan.isValid()):
+            cycleDescription = " -> ".join([f"{node.title()} ({node.uniqueIdentifier()})" for node in plan.cycle() + plan.cycle()[:1]])
+            print(f"ERROR: The graph contains a cycle and can't be executed: {cycleDescription}")
+
+        return plan
+
+    def execute(self, plan: KSGraphExecutionPlan = None, force: bool = False) -> bool:
+        """
+        Runs the nodes of the plan (the whole graph by default) exactly once, in dependency order.
+        Clean nodes are skipped and keep serving their cached output data, unless force is set.
+        """
+        if (plan == None):
+            plan = self.buildPlan()
+
+        if (not plan.isValid()):
+            return False
+
+        for node in plan.order():
+            if (not force and not node.isDirty()):
+                continue
+
+            if (self._resultCache != None and self._resultCache.load(node)):
+                node.markClean()
+                continue
+
+            if (not self.executeNodeImplicit(node)):
+                print(f"ERROR: Execution stopped, node '{node.title()}' ({node.uniqueIdentifier()}) failed.")
+                return False
+            node.markClean()
+
+            if (self._resultCache != None):
+                self._resultCache.store(node)
+
+        return True
+
+    def executeNode(self, node: KSNode, force: bool = False) -> bool:
+        """ Runs the node after every node it (transitively) depends on. """
+        nodes = {}
+        pendingNodes = [node]
+        while (len(pendingNodes) > 0):
+            pendingNode = pendingNodes.pop()
+            if (pendingNode in nodes):
+                continue
+            nodes[pendingNode] = None
+            pendingNodes.extend(pendingNode.upstreamNodes())
+
+        return self.execute(self.buildPlan(list(nodes)), force)
+
+    def executeParallel(self, plan: KSGraphExecutionPlan = None, force: bool = False, maxWorkers: int = None, useProcesses: bool = False) -> bool:
+        """
+        Like execute(), but nodes whose dependencies are done run at the same time.
+        Thread safe nodes run on a thread pool, pure nodes on a process pool when useProcesses is set,
+        every other node runs on the calling thread.
+        """
+        if (plan == None):
+            plan = self.buildPlan()
+
+        if (not plan.isValid()):
+            return False
+
+        pendingNodes = [node for node in plan.order() if force or node.isDirty()]
+        pendingSet = set(pendingNodes)
+        waitingFor = { node:len([upstreamNode for upstreamNode in node.upstreamNodes() if upstreamNode in pendingSet]) for node in pendingNodes }
+        readyNodes = collections.deque([node for node in pendingNodes if waitingFor[node] == 0])
+
+        threadPool = concurrent.futures.ThreadPoolExecutor(max_workers=maxWorkers)
+        processPool = concurrent.futures.ProcessPoolExecutor(max_workers=maxWorkers) if useProcesses else None
+        runningNodes = {}
+        failedNode = None
+
+        def onNodeExecuted(node: KSNode) -> None:
+            if (self._resultCache != None):
+                self._resultCache.store(node)
+            onNodeDone(node)
+
+        def onNodeDone(node: KSNode) -> None:
+            node.markClean()
+            for downstreamNode in node.downstreamNodes():
+                if (downstreamNode in waitingFor):
+                    waitingFor[downstreamNode] -= 1
+                    if (waitingFor[downstreamNode] == 0):
+                        readyNodes.append(downstreamNode)
+
+        def onFutureDone(future: concurrent.futures.Future) -> KSNode:
+            node, isDetached = runningNodes.pop(future)
+            if (isDetached):
+                success, outputData, wallTime, cpuTime = future.result()
+                for outputKey in outputData:
+                    node._outputs[outputKey].setData(outputData[outputKey])
+                if (self._profiler != None):
+                    self._profiler.record(node, wallTime, cpuTime)
+            else:
+                success = future.result()
+
+            if (success):
+                onNodeExecuted(node)
+                return None
+            return node
+
+        try:
+            while (failedNode == None and (len(readyNodes) > 0 or len(runningNodes) > 0)):
+                mainThreadNodes = []
+                while (len(readyNodes) > 0):
+                    node = readyNodes.popleft()
+                    if (self._resultCache != None and self._resultCache.load(node)):
+                        onNodeDone(node)
+                    elif (node._mainThreadOnly):
+                        mainThreadNodes.append(node)
+                    elif (node._pure and processPool != None):
+                        inputData = { inputKey:node._inputs[inputKey].data() for inputKey in node._inputs }
+                        runningNodes[processPool.submit(executeDetachedNode, type(node), inputData)] = (node, True)
+                    elif (node._threadSafe):
+                        runningNodes[threadPool.submit(self.executeNodeImplicit, node)] = (node, False)
+                    else:
+                        mainThreadNodes.append(node)
+
+                # Nodes bound to the calling thread run while the workers are busy.
+                for node in mainThreadNodes:
+                    if (failedNode != None):
+                        break
+                    if (self.executeNodeImplicit(node)):
+                        onNodeExecuted(node)
+                    else:
+                        failedNode = node
+
+                if (len(runningNodes) == 0 or failedNode != None):
+                    continue
+
+                # Only block when there is nothing left to run on this thread.
+                timeout = 0 if len(readyNodes) > 0 else None
+                doneFutures, _ = concurrent.futures.wait(list(runningNodes), timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in doneFutures:
+                    node = onFutureDone(future)
+                    if (node != None and failedNode == None):
+                        failedNode = node
+        finally:
+            threadPool.shutdown(wait=True)
+            if (processPool != None):
+                processPool.shutdown(wait=True)
+
+        if (failedNode != None):
+            print(f"ERROR: Execution stopped, node '{failedNode.title()}' ({failedNode.uniqueIdentifier()}) failed.")
+            return False
+
+        return True
+
+    async def executeAsync(self, plan: KSGraphExecutionPlan = None, force: bool = False) -> bool:
+        """
+        Like execute(), but runs on an asyncio event loop: nodes with an 'async def execute()' are awaited concurrently
+        as soon as their dependencies are done, thread safe nodes run in the loop's default executor and every other
+        node runs directly on the loop's thread.
+        """
+        if (plan == None):
+            plan = self.buildPlan()
+
+        if (not plan.isValid()):
+            return False
+
+        loop = asyncio.get_running_loop()
+        pendingNodes = [node for node in plan.order() if force or node.isDirty()]
+        pendingSet = set(pendingNodes)
+        waitingFor = { node:len([upstreamNode for upstreamNode in node.upstreamNodes() if upstreamNode in pendingSet]) for node in pendingNodes }
+        readyNodes = collections.deque([node for node in pendingNodes if waitingFor[node] == 0])
+        runningNodes = {}
+        failedNode = None
+
+        def onNodeDone(node: KSNode) -> None:
+            node.markClean()
+            for downstreamNode in node.downstreamNodes():
+                if (downstreamNode in waitingFor):
+                    waitingFor[downstreamNode] -= 1
+                    if (waitingFor[downstreamNode] == 0):
+                        readyNodes.append(downstreamNode)
+
+        def onNodeExecuted(node: KSNode) -> None:
+            if (self._resultCache != None):
+                self._resultCache.store(node)
+            onNodeDone(node)
+
+        try:
+            while (failedNode == None and (len(readyNodes) > 0 or len(runningNodes) > 0)):
+                while (len(readyNodes) > 0 and failedNode == None):
+                    node = readyNodes.popleft()
+                    if (self._resultCache != None and self._resultCache.load(node)):
+                        onNodeDone(node)
+                    elif (node.bindingPlan().isCoroutine()):
+                        runningNodes[asyncio.ensure_future(self.executeNodeImplicitAsync(node))] = node
+                    elif (node._threadSafe and not node._mainThreadOnly):
+                        runningNodes[loop.run_in_executor(None, self.executeNodeImplicit, node)] = node
+                    elif (self.executeNodeImplicit(node)):
+                        onNodeExecuted(node)
+                    else:
+                        failedNode = node
+
+                if (len(runningNodes) == 0 or failedNode != None):
+                    continue
+
+                doneFutures, _ = await asyncio.wait(list(runningNodes), return_when=asyncio.FIRST_COMPLETED)
+                for future in doneFutures:
+                    node = runningNodes.pop(future)
+                    if (future.result()):
+                        onNodeExecuted(node)
+                    elif (failedNode == None):
+                        failedNode = node
+        finally:
+            if (len(runningNodes) > 0):
+                # Let nodes that are already running finish, their outputs stay dirty.
+                await asyncio.wait(list(runningNodes))
+
+        if (failedNode != None):
+            print(f"ERROR: Execution stopped, node '{failedNode.title()}' ({failedNode.uniqueIdentifier()}) failed.")
+            return False
+
+        return True
+
+    def executeBatch(self, records: typing.List[typing.Dict[str, typing.Dict[str, typing.Any]]], plan: KSGraphExecutionPlan = None) -> typing.List[typing.Dict[str, typing.Dict[str, typing.Any]]]:
+        """
+        Runs the graph once per record, resolving the plan only once.
+        A record maps node UUIDs to {inputKey: value} overrides of that node's manual input data.
+        Returns one {nodeUUID: {outputKey: value}} dictionary per record, or None on failure.
+        """
+        if (plan == None):
+            plan = self.buildPlan()
+
+        if (not plan.isValid()):
+            return None
+
+        recordCount = len(records)
+        columns = {}
+        manualData = {}
+        # Output data of providers outside the plan, overwritten while feeding batch values.
+        providerData = {}
+
+        def inputColumn(node: KSNode, inputKey: str) -> typing.List[typing.Any]:
+            port = node._inputs[inputKey]
+            if (port.connection() != None):
+                # Providers outside the plan keep the data of their last run.
+                if (port.connection() not in columns):
+                    return [port.data()] * recordCount
+                return columns[port.connection()]
+
+            column = []
+            for record in records:
+                overrides = record.get(node.uniqueIdentifier(), None)
+                column.append(overrides[inputKey] if (overrides != None and inputKey in overrides) else port.manualData())
+            return column
+
+        def setInputData(node: KSNode, values: typing.Dict[str, typing.Any]) -> None:
+            # Connected inputs read from the upstream output, so the value is placed there instead.
+            for inputKey in values:
+                port = node._inputs[inputKey]
+                if (port.connection() != None):
+                    if (port.connection() not in columns and port.connection() not in providerData):
+                        providerData[port.connection()] = port.connection()._dataCache
+                    port.connection()._dataCache = values[inputKey]
+                else:
+                    port._manualData = values[inputKey]
+
+        success = True
+        try:
+            for node in plan.order():
+                inputColumns = { inputKey:inputColumn(node, inputKey) for inputKey in node._inputs }
+                for inputKey in node._inputs:
+                    manualData[node._inputs[inputKey]] = node._inputs[inputKey]._manualData
+
+                if (node._batchSupport):
+                    setInputData(node, inputColumns)
+                    node._batchSize = recordCount
+                    try:
+                        if (not self.executeNodeImplicit(node)):
+                            success = False
+                            break
+                    finally:
+                        node._batchSize = None
+
+                    for outputKey in node._outputs:
+                        column = node._outputs[outputKey].data()
+                        if (not isinstance(column, list) or len(column) != recordCount):
+                            print(f"ERROR: Batch node '{node.title()}' ({node.uniqueIdentifier()}) did not provide {recordCount} values for output: {outputKey}")
+                            success = False
+                            break
+                        columns[node._outputs[outputKey]] = column
+                    if (not success):
+                        break
+                    continue
+
+                outputColumns = { node._outputs[outputKey]:[] for outputKey in node._outputs }
+                for recordIndex in range(recordCount):
+                    setInputData(node, { inputKey:inputColumns[inputKey][recordIndex] for inputKey in inputColumns })
+                    if (self._resultCache == None or not self._resultCache.load(node)):
+                        if (not self.executeNodeImplicit(node)):
+                            success = False
+                            break
+                        if (self._resultCache != None):
+                            self._resultCache.store(node)
+
+                    for port in outputColumns:
+                        outputColumns[port].append(port.data())
+                if (not success):
+                    break
+                columns.update(outputColumns)
+        finally:
+            # Restore the graph's own manual input data, the cached outputs now hold batch values and are stale.
+            for port in manualData:
+                port._manualData = manualData[port]
+            for port in providerData:
+                port._dataCache = providerData[port]
+            for plannedNode in plan.order():
+                plannedNode.markDirty()
+
+        if (not success):
+            print(f"ERROR: Batch execution stopped, node '{node.title()}' ({node.uniqueIdentifier()}) failed.")
+            return None
+
+        results = []
+        for recordIndex in range(recordCount):
+            results.append({ node.uniqueIdentifier():{ outputKey:columns[node._outputs[outputKey]][recordIndex] for outputKey in node._outputs } for node in plan.order() })
+
+        return results
@@ -0,0 +1,154 @@
+import typing
+import threading
+import json
+import os
+
+from .KSGraphModel import KSGraph, KSNode
+from .KSGraphBinary import KSGraphBinaryWriter, isBinaryGraphFile
+from .KSJsonStream import writeJsonItems
+
+JOURNAL_SUFFIX = ".journal"
+
+def writeGraphFile(filepath: str, items: typing.Iterable[object]) -> None:
+    """
+    Writes serialized nodes as a complete graph file (binary or JSON, by extension), atomically replacing the old file.
+    JSON is streamed one item at a time, the binary writer needs all of them up front to resolve node references.
+    """
+    temporaryPath = filepath + f".{os.getpid()}.{threading.get_ident()}.tmp"
+    if (isBinaryGraphFile(filepath)):
+        with open(temporaryPath, "wb") as file:
+            KSGraphBinaryWriter().write(file, list(items))
+    else:
+        with open(temporaryPath, "w") as file:
+            writeJsonItems(file, items)
+    os.replace(temporaryPath, filepath)
+
+class KSGraphJournal(object):
+    """
+    Journaled saving of a graph file. Instead of rewriting the whole file, save() appends the nodes modified since the
+    previous save to "<file>.journal", one JSON record per line. Once the journal outgrows the compaction threshold,
+    a complete snapshot is written to the graph file on a background thread and the journal starts over.
+    load() replays the journal on top of the graph file.
+    """
+    _filepath: str = None
+    _compactionThreshold: int = None
+    _lock: threading.Lock = None
+    _compactionThread: threading.Thread = None
+
+    def __init__(self, filepath: str, compactionThreshold: int = 4 * 1024 * 1024) -> None:
+        self._filepath = filepath
+        self._compactionThreshold = compactionThreshold
+        self._lock = threading.Lock()
+
+    def filepath(self) -> str:
+        return self._filepath
+
+    def journalFilepath(self) -> str:
+        return self._filepath + JOURNAL_SUFFIX
+
+    def journalSize(self) -> int:
+        return os.path.getsize(self.journalFilepath()) if os.path.isfile(self.journalFilepath()) else 0
+
+    def compactionThreshold(self) -> int:
+        return self._compactionThreshold
+
+    def setCompactionThreshold(self, compactionThreshold: int) -> None:
+        self._compactionThreshold = compactionThreshold
+
+    def isCompacting(self) -> bool:
+        return self._compactionThread != None and self._compactionThread.is_alive()
+
+    def waitForCompaction(self) -> None:
+        if (self._compactionThread != None):
+            self._compactionThread.join()
+            self._compactionThread = None
+
+    def writeSnapshot(self, graph: KSGraph) -> None:
+        """ Writes the complete graph file and drops the journal. """
+        self.waitForCompaction()
+        writeGraphFile(self._filepath, (node.serialize() for node in graph.nodes()))
+        with self._lock:
+            if (os.path.isfile(self.journalFilepath())):
+                os.remove(self.journalFilepath())
+        graph.clearModifications()
+
+    def save(self, graph: KSGraph) -> None:
+        if (not os.path.isfile(self._filepath)):
+            self.writeSnapshot(graph)
+            return
+
+        modifiedNodes, removedNodes = graph.takeModifications()
+        if (len(modifiedNodes) > 0 or len(removedNodes) > 0):
+            record = json.dumps({ 'items': [node.serialize() for node in modifiedNodes], 'removed': removedNodes })
+            with self._lock:
+                with open(self.journalFilepath(), "a") as file:
+                    file.write(record + "\n")
+
+        if (self.journalSize() > self._compactionThreshold and not self.isCompacting()):
+            self.compact(graph)
+
+    def compact(self, graph: KSGraph) -> None:
+        """ Writes a snapshot on a background thread, then drops the journal records it contains. """
+        # Serialize on the calling thread, the graph is not safe to read while it's being edited.
+        items = [node.serialize() for node in graph.nodes()]
+        with self._lock:
+            journalOffset = self.journalSize()
+
+        def run() -> None:
+            writeGraphFile(self._filepath, items)
+            self.truncate(journalOffset)
+
+        self.waitForCompaction()
+        self._compactionThread = threading.Thread(target=run, name="KSGraphJournalCompaction", daemon=True)
+        self._compactionThread.start()
+
+    def truncate(self, offset: int) -> None:
+        """ Drops the first offset bytes of the journal, keeping records appended after them. """
+        with self._lock:
+            if (not os.path.isfile(self.journalFilepath())):
+                return
+
+            with open(self.journalFilepath(), "rb") as file:
+                file.seek(offset)
+                remainder = file.read()
+
+            if (len(remainder) == 0):
+                os.remove(self.journalFilepath())
+                return
+
+            temporaryPath = self.journalFilepath() + f".{os.getpid()}.tmp"
+            with open(temporaryPath, "wb") as file:
+                file.write(remainder)
+            os.replace(temporaryPath, self.journalFilepath())
+
+    def load(self, graph: KSGraph) -> typing.List[KSNode]:
+        """ Deserializes the graph file and replays the journal on top of it, returns the nodes added to the graph. """
+        if (isBinaryGraphFile(self._filepath)):
+            with open(self._filepath, "rb") as file:
+                nodes = graph.deserializeFromBinaryFile(file)
+        else:
+            with open(self._filepath) as file:
+                nodes = graph.deserializeFromFile(file)
+
+        if (os.path.isfile(self.journalFilepath())):
+            validRecords = []
+            with open(self.journalFilepath()) as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Interrupted while appending, this and anything after it can't be trusted.
+                        print(f"ERROR: Ignoring damaged records at the end of journal '{self.journalFilepath()}'.")
+                        break
+                    nodes += graph.applyModifications(record['items'], record['removed'])
+                    validRecords.append(line)
+                else:
+                    validRecords = None
+
+            if (validRecords != None):
+                with self._lock:
+                    with open(self.journalFilepath(), "w") as file:
+                        file.write("".join(validRecords))
+
+        graph.clearModifications()
+        return [node for node in nodes if graph.getNode(node.uniqueIdentifier()) == node]
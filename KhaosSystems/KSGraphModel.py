@@ -0,0 +1,638 @@
+import typing
+import json
+import uuid
+import asyncio
+import inspect
+
+from .KSJsonStream import KSJsonItemStreamReader, writeJsonItems
+from .KSGraphBinary import KSGraphBinaryWriter, KSGraphBinaryReader
+
+# Pure-Python graph core; nodes, ports, connections and values.
+# Nothing in here may depend on Qt, so graphs can be loaded and executed headless (e.g. on build nodes).
+# The Qt views in KSNodeGraph bind to these objects.
+
+MANUAL_INPUT_DEFAULTS: typing.Dict[type, typing.Any] = {
+    str: "L_Joint_jnt",
+    bool: False
+}
+
+class KSNodeInputPort(object):
+    _node: "KSNode" = None
+    _key: str = None
+    _datatype: type = None
+    _connection: "KSNodeOutputPort" = None
+    _manualData: typing.Any = None
+
+    def __init__(self, node: "KSNode", key: str, datatype: type) -> None:
+        self._node = node
+        self._key = key
+        self._datatype = datatype
+        self._manualData = MANUAL_INPUT_DEFAULTS.get(datatype, None)
+
+    def node(self) -> "KSNode":
+        return self._node
+
+    def key(self) -> str:
+        return self._key
+
+    def datatype(self) -> type:
+        return self._datatype
+
+    def connection(self) -> "KSNodeOutputPort":
+        return self._connection
+
+    def isUsingManualInput(self) -> bool:
+        return self._connection == None
+
+    def connect(self, output: "KSNodeOutputPort") -> None:
+        if (self._connection != None):
+            self.disconnect()
+
+        self._connection = output
+        self._connection.onConnect(self)
+        self._node.markDirty()
+        self._node.markModified()
+
+    def disconnect(self) -> None:
+        if (self._connection == None):
+            return
+
+        self._connection.onDisconnect(self)
+        self._connection = None
+        self._node.markDirty()
+        self._node.markModified()
+
+    def manualData(self) -> typing.Any:
+        return self._manualData
+
+    def setManualData(self, data: typing.Any) -> None:
+        if (data == self._manualData):
+            return
+
+        self._manualData = data
+        self._node.markModified()
+        if (self.isUsingManualInput()):
+            self._node.markDirty()
+
+    def data(self) -> typing.Any:
+        if (self._connection != None):
+            return self._connection.data()
+        else:
+            return self._manualData
+
+    def serialize(self) -> object:
+        connectionUUID = ""
+        connectionOutputKey = ""
+        if (self._connection != None):
+            connectionUUID = self._connection.node().uniqueIdentifier()
+            connectionOutputKey = self._connection.key()
+
+        return {
+            'manualInputData': self._manualData,
+            'connectionUUID': connectionUUID,
+            'connectionOutputKey': connectionOutputKey
+            }
+
+    def deserialize(self, graph: "KSGraph", data: object) -> None:
+        self._manualData = data['manualInputData']
+
+        provider = graph.getNode(data['connectionUUID'])
+        if (provider != None and data['connectionOutputKey'] in provider._outputs):
+            self.connect(provider._outputs[data['connectionOutputKey']])
+
+class KSNodeOutputPort(object):
+    _node: "KSNode" = None
+    _key: str = None
+    _datatype: type = None
+    _dataCache: typing.Any = None
+    _connections: typing.List[KSNodeInputPort] = None
+
+    def __init__(self, node: "KSNode", key: str, datatype: type) -> None:
+        self._node = node
+        self._key = key
+        self._datatype = datatype
+        self._connections = []
+
+    def node(self) -> "KSNode":
+        return self._node
+
+    def key(self) -> str:
+        return self._key
+
+    def datatype(self) -> type:
+        return self._datatype
+
+    def connections(self) -> typing.List[KSNodeInputPort]:
+        return self._connections
+
+    def onConnect(self, connection: KSNodeInputPort) -> None:
+        self._connections.append(connection)
+
+    def onDisconnect(self, connection: KSNodeInputPort) -> None:
+        self._connections.remove(connection)
+
+    def setData(self, data: typing.Any) -> None:
+        self._dataCache = data
+
+    def data(self) -> typing.Any:
+        return self._dataCache
+
+class KSNodeBindingPlan(object):
+    """ Signature analysis of a node type's execute(), computed once per class and shared by all its instances. """
+    _argumentKeys: typing.Tuple[str, ...] = None
+    _returnType: type = None
+    _isCoroutine: bool = False
+    _error: str = None
+
+    def __init__(self, nodeType: type) -> None:
+        self._argumentKeys = ()
+        self._isCoroutine = inspect.iscoroutinefunction(nodeType.execute)
+
+        executeAnnotations: dict = nodeType.execute.__annotations__
+        if ('return' not in executeAnnotations):
+            self._error = "The 'execute' function always need to provide a return type! If the desired return type is void/None, use the 'None' type."
+            return
+
+        argumentKeys = []
+        for annotationKey in executeAnnotations:
+            if (annotationKey == 'return'):
+                continue
+            elif (annotationKey in nodeType._inputDefinitions):
+                argumentKeys.append(annotationKey)
+            else:
+                self._error = f"Failed to provide 'execute()' argument with identifier: {annotationKey}"
+                return
+
+        if (executeAnnotations['return'] != None and 'return' not in nodeType._outputDefinitions):
+            self._error = "An 'execute' function returning data requires an output with identifier: return"
+            return
+
+        self._argumentKeys = tuple(argumentKeys)
+        self._returnType = executeAnnotations['return']
+
+    def argumentKeys(self) -> typing.Tuple[str, ...]:
+        return self._argumentKeys
+
+    def returnType(self) -> type:
+        return self._returnType
+
+    def isCoroutine(self) -> bool:
+        """ True for 'async def execute()' nodes. """
+        return self._isCoroutine
+
+    def isValid(self) -> bool:
+        return self._error == None
+
+    def error(self) -> str:
+        return self._error
+
+class KSNode(object):
+    _title: str = "Node Title"
+
+    _inputDefinitions: typing.Dict[str, type] = {}
+    _outputDefinitions: typing.Dict[str, type] = {}
+
+    _inputs: typing.Dict[str, KSNodeInputPort] = None
+    _outputs: typing.Dict[str, KSNodeOutputPort] = None
+
+    _position: typing.Tuple[float, float] = (0.0, 0.0)
+
+    _uniqueIdentifier: str = None
+
+    # Graph the node was added to, notified of changes that have to be saved (see KSGraph.takeModifications()).
+    _graph: "KSGraph" = None
+    # Incremented on every change that affects serialize().
+    _revision: int = 0
+
+    # Set when the cached output data is stale, see markDirty().
+    _dirty: bool = True
+
+    # Execution traits used by the parallel executor, all opt-in.
+    # _threadSafe: execute() may run on a worker thread.
+    # _pure: execute() only depends on the input data and only writes output data, so it may run in a worker process.
+    # _mainThreadOnly: execute() must run on the thread driving the execution (e.g. when calling into Maya).
+    _threadSafe: bool = False
+    _pure: bool = False
+    _mainThreadOnly: bool = False
+
+    # When set, KSGraphExecutor.executeBatch() executes the node once per batch; every input then provides a list
+    # with one value per record and every output has to be set to a list of the same length. Every other execution
+    # passes single values as usual, execute() tells them apart through isBatching().
+    _batchSupport: bool = False
+    # Record count while executeBatch() executes the node once per batch.
+    _batchSize: int = None
+
+    # Bump when execute() changes in a way its bytecode doesn't reflect (e.g. a changed helper), invalidates cached results.
+    _version: str = "1"
+
+    _tmpDisableAutoOutputs: bool = False
+
+    # execute() argument ports and return value port, resolved from the class binding plan by bindPorts().
+    _boundInputs: typing.Tuple[KSNodeInputPort, ...] = None
+    _boundReturnOutput: KSNodeOutputPort = None
+
+    def __init__(self) -> None:
+        self.createInputs()
+        if not self._tmpDisableAutoOutputs:
+            self.createOutputs()
+        else:
+            self._outputs = {}
+
+        self.bindPorts()
+
+    def createInputs(self) -> None:
+        self._inputs = {}
+        for inputDefinitionKey in self._inputDefinitions:
+            self._inputs[inputDefinitionKey] = KSNodeInputPort(self, inputDefinitionKey, self._inputDefinitions[inputDefinitionKey])
+
+    def createOutputs(self) -> None:
+        self._outputs = {}
+        for outputDefinitionKey in self._outputDefinitions:
+            self._outputs[outputDefinitionKey] = KSNodeOutputPort(self, outputDefinitionKey, self._outputDefinitions[outputDefinitionKey])
+
+    def title(self) -> str:
+        return self._title
+
+    def inputs(self) -> typing.Dict[str, KSNodeInputPort]:
+        return self._inputs
+
+    def outputs(self) -> typing.Dict[str, KSNodeOutputPort]:
+        return self._outputs
+
+    def position(self) -> typing.Tuple[float, float]:
+        return self._position
+
+    def setPosition(self, x: float, y: float) -> None:
+        # Node items pass their position back on creation, which must not count as a modification.
+        if ((x, y) == self._position):
+            return
+        self._position = (x, y)
+        self.markModified()
+
+    def batchSize(self) -> typing.Optional[int]:
+        """ Number of records of the batch being executed, None unless executed once per batch. """
+        return self._batchSize
+
+    def isBatching(self) -> bool:
+        return self._batchSize != None
+
+    def revision(self) -> int:
+        return self._revision
+
+    def markModified(self) -> None:
+        self._revision += 1
+        if (self._graph != None):
+            self._graph.onNodeModified(self)
+
+    def upstreamNodes(self) -> typing.List["KSNode"]:
+        """ Nodes providing data to one or more of this node's inputs. """
+        nodes = []
+        for inputKey in self._inputs:
+            connection = self._inputs[inputKey].connection()
+            if (connection != None and connection.node() not in nodes):
+                nodes.append(connection.node())
+        return nodes
+
+    def downstreamNodes(self) -> typing.List["KSNode"]:
+        """ Nodes consuming data from one or more of this node's outputs. """
+        nodes = []
+        for outputKey in self._outputs:
+            for connection in self._outputs[outputKey].connections():
+                if (connection.node() not in nodes):
+                    nodes.append(connection.node())
+        return nodes
+
+    def isDirty(self) -> bool:
+        return self._dirty
+
+    def markDirty(self) -> None:
+        """ Flags this node and everything downstream of it for re-execution. """
+        pendingNodes = [self]
+        while (len(pendingNodes) > 0):
+            node = pendingNodes.pop()
+            # Downstream nodes of a dirty node are already dirty, unless this is the node that changed.
+            if (node._dirty and node != self):
+                continue
+            node._dirty = True
+            pendingNodes.extend(node.downstreamNodes())
+
+    def markClean(self) -> None:
+        self._dirty = False
+
+    def getInputData(self, inputKey: str) -> typing.Any:
+        return self._inputs[inputKey].data()
+
+    def setOutputData(self, outputKey: str, data: typing.Any) -> None:
+        self._outputs[outputKey].setData(data)
+
+    @classmethod
+    def bindingPlan(cls) -> KSNodeBindingPlan:
+        # Looked up in the class dictionary, so subclasses never pick up the plan of their base class.
+        plan = cls.__dict__.get('_bindingPlan', None)
+        if (plan == None):
+            plan = KSNodeBindingPlan(cls)
+            cls._bindingPlan = plan
+        return plan
+
+    def bindPorts(self) -> None:
+        plan = self.bindingPlan()
+        self._boundInputs = tuple(self._inputs[key] for key in plan.argumentKeys())
+        self._boundReturnOutput = self._outputs.get('return', None)
+
+    def executeImplicit(self) -> bool:
+        plan = self.bindingPlan()
+        if (not plan.isValid()):
+            print(f"ERROR: {plan.error()}")
+            return False
+
+        executeReturnData = self.execute(*[port.data() for port in self._boundInputs])
+        if (plan.isCoroutine()):
+            # Async nodes executed outside of an event loop simply run to completion.
+            executeReturnData = asyncio.run(executeReturnData)
+
+        return self.applyExecuteReturnData(plan, executeReturnData)
+
+    async def executeImplicitAsync(self) -> bool:
+        plan = self.bindingPlan()
+        if (not plan.isValid()):
+            print(f"ERROR: {plan.error()}")
+            return False
+
+        executeReturnData = self.execute(*[port.data() for port in self._boundInputs])
+        if (plan.isCoroutine()):
+            executeReturnData = await executeReturnData
+
+        return self.applyExecuteReturnData(plan, executeReturnData)
+
+    def applyExecuteReturnData(self, plan: KSNodeBindingPlan, executeReturnData: typing.Any) -> bool:
+        if (plan.returnType() == None):
+            return True
+
+        if (type(executeReturnData) is not plan.returnType()):
+            print("ERROR: The data returned by execute() did not match with the specified return type!")
+            return False
+
+        self._boundReturnOutput.setData(executeReturnData)
+        return True
+
+    def execute(self) -> None:
+        pass
+
+    # region Serialization
+    def serialize(self) -> object:
+        data = {
+            'typeIdentifier': self.typeIdentifier(),
+            'UUID': self.uniqueIdentifier(),
+            'position': [self._position[0], self._position[1]],
+            'inputs': { i:self._inputs[i].serialize() for i in self._inputs }
+        }
+
+        return data
+
+    @staticmethod
+    def deserialize(graph: "KSGraph", data: object) -> "KSNode":
+        nodeType = graph.getNodeTypeFromIdentifier(data['typeIdentifier'])
+        if (nodeType == None):
+            print("ERROR: Failed to deserialize node.")
+            return None
+
+        node = nodeType()
+        node._uniqueIdentifier = data['UUID']
+        node.setPosition(data['position'][0], data['position'][1])
+
+        return node
+
+    def deserializeInputs(self, graph: "KSGraph", data: object) -> None:
+        for inputKey in data['inputs']:
+            if (inputKey in self._inputs):
+                inputData = data['inputs'][inputKey]
+                self._inputs[inputKey].deserialize(graph, inputData)
+
+    @classmethod
+    def typeIdentifier(cls) -> str:
+        return cls.__name__
+
+    def uniqueIdentifier(self) -> str:
+        if (self._uniqueIdentifier == None):
+            self._uniqueIdentifier =  ("NODE_" + str(uuid.uuid4().int))
+
+        return self._uniqueIdentifier
+    # endregion
+
+class KSGraph(object):
+    _nodeTypes: typing.Dict[str, type] = None
+    _nodes: typing.Dict[str, KSNode] = None
+
+    # Changes since the last takeModifications(), used for journaled saving.
+    _modifiedNodes: typing.Dict[str, KSNode] = None
+    _removedNodes: typing.Set[str] = None
+
+    def __init__(self) -> None:
+        self._nodeTypes = {}
+        self._nodes = {}
+        self.clearModifications()
+
+    # region Node types
+    def addNodeType(self, nodeType: type) -> bool:
+        if (not issubclass(nodeType, KSNode)):
+            print(f"ERROR: Node types must derive from KSNode, got: {nodeType.__name__}.")
+            return False
+
+        if (nodeType.typeIdentifier() in self._nodeTypes):
+            print(f"ERROR: The node dictionary already contains an entry with identifier: {nodeType.typeIdentifier()}.")
+            return False
+
+        # Compile the execute() binding plan up front, rather than on the first execution.
+        plan = nodeType.bindingPlan()
+        if (not plan.isValid()):
+            print(f"ERROR: Node type '{nodeType.typeIdentifier()}' can't be executed: {plan.error()}")
+
+        self._nodeTypes[nodeType.typeIdentifier()] = nodeType
+        return True
+
+    def nodeTypes(self) -> typing.Dict[str, type]:
+        return self._nodeTypes
+
+    def getNodeTypeFromIdentifier(self, identifier: str) -> type:
+        return self._nodeTypes.get(identifier, None)
+    # endregion
+
+    # region Nodes
+    def addNode(self, node: KSNode) -> bool:
+        if (node.typeIdentifier() not in self._nodeTypes):
+            print(f"ERROR: Failed to find node type with identifier: {node.typeIdentifier()} in the node dictionary.")
+            return False
+
+        self._nodes[node.uniqueIdentifier()] = node
+        node._graph = self
+        self.onNodeModified(node)
+        return True
+
+    def removeNode(self, node: KSNode) -> None:
+        if (self._nodes.get(node.uniqueIdentifier(), None) != node):
+            return
+
+        for inputKey in node._inputs:
+            node._inputs[inputKey].disconnect()
+        for outputKey in node._outputs:
+            for connection in list(node._outputs[outputKey].connections()):
+                connection.disconnect()
+
+        del self._nodes[node.uniqueIdentifier()]
+        node._graph = None
+        self._modifiedNodes.pop(node.uniqueIdentifier(), None)
+        self._removedNodes.add(node.uniqueIdentifier())
+
+    def removeAllNodes(self) -> None:
+        for node in list(self._nodes.values()):
+            self.removeNode(node)
+
+    def getNode(self, uniqueIdentifier: str) -> KSNode:
+        return self._nodes.get(uniqueIdentifier, None)
+
+    def nodes(self) -> typing.List[KSNode]:
+        return list(self._nodes.values())
+    # endregion
+
+    # region Modifications
+    def onNodeModified(self, node: KSNode) -> None:
+        self._modifiedNodes[node.uniqueIdentifier()] = node
+        self._removedNodes.discard(node.uniqueIdentifier())
+
+    def hasModifications(self) -> bool:
+        return len(self._modifiedNodes) > 0 or len(self._removedNodes) > 0
+
+    def takeModifications(self) -> typing.Tuple[typing.List[KSNode], typing.List[str]]:
+        """ Returns the nodes added or changed and the UUIDs of the nodes removed since the last call, and clears both. """
+        modifiedNodes, removedNodes = list(self._modifiedNodes.values()), list(self._removedNodes)
+        self.clearModifications()
+        return modifiedNodes, removedNodes
+
+    def clearModifications(self) -> None:
+        self._modifiedNodes = {}
+        self._removedNodes = set()
+
+    def applyModifications(self, items: typing.List[object], removedNodes: typing.List[str]) -> typing.List[KSNode]:
+        """
+        Applies serialized modifications, as taken by takeModifications(); existing nodes are updated in place, others
+        are created. Returns the created nodes.
+        """
+        for uniqueIdentifier in removedNodes:
+            node = self.getNode(uniqueIdentifier)
+            if (node != None):
+                self.removeNode(node)
+
+        createdNodes = []
+        for itemData in items:
+            node = self.getNode(itemData['UUID'])
+            if (node == None):
+                node = KSNode.deserialize(self, itemData)
+                if (node == None or not self.addNode(node)):
+                    continue
+                createdNodes.append(node)
+            else:
+                node.setPosition(itemData['position'][0], itemData['position'][1])
+
+        # Connections once every node exists, a provider may be created by a later item.
+        for itemData in items:
+            node = self.getNode(itemData['UUID'])
+            if (node == None):
+                continue
+            for inputKey in itemData['inputs']:
+                if (inputKey in node._inputs):
+                    node._inputs[inputKey].disconnect()
+                    node._inputs[inputKey].deserialize(self, itemData['inputs'][inputKey])
+
+        return createdNodes
+    # endregion
+
+    # region Serialization and deserialization
+    def serialize(self) -> object:
+        return { 'items': [self._nodes[key].serialize() for key in self._nodes] }
+
+    def serializeToJson(self) -> str:
+        return json.dumps(self.serialize())
+
+    def deserialize(self, data: object) -> typing.List[KSNode]:
+        deserializedNodes = []
+        if (data['items'] == None):
+            return deserializedNodes
+
+        # Add nodes
+        nodeData = []
+        for itemData in data['items']:
+            node = KSNode.deserialize(self, itemData)
+            if (node != None and self.addNode(node)):
+                deserializedNodes.append(node)
+                nodeData.append([node, itemData])
+
+        # Add connections
+        for node, itemData in nodeData:
+            node.deserializeInputs(self, itemData)
+
+        return deserializedNodes
+
+    def deserializeFromJson(self, jsonStr: str) -> typing.List[KSNode]:
+        return self.deserialize(json.loads(jsonStr))
+
+    def serializeToFile(self, file: typing.TextIO) -> None:
+        """ Writes the same JSON as serializeToJson(), one node at a time instead of building the whole string first. """
+        writeJsonItems(file, (node.serialize() for node in self._nodes.values()))
+
+    def deserializeFromFile(self, file: typing.TextIO) -> typing.List[KSNode]:
+        """ Incremental counterpart of deserializeFromJson(), nodes are created as they are parsed from the file. """
+        deserializedNodes = []
+        pendingInputs = []
+
+        for itemData in KSJsonItemStreamReader(file, 'items').items():
+            node = KSNode.deserialize(self, itemData)
+            if (node == None or not self.addNode(node)):
+                continue
+            deserializedNodes.append(node)
+
+            # Connect right away when the provider was already parsed, otherwise once every node exists.
+            for inputKey in itemData['inputs']:
+                if (inputKey not in node._inputs):
+                    continue
+                inputData = itemData['inputs'][inputKey]
+                node._inputs[inputKey].deserialize(self, inputData)
+                if (inputData['connectionUUID'] != "" and node._inputs[inputKey].connection() == None):
+                    pendingInputs.append((node._inputs[inputKey], inputData))
+
+        for inputPort, inputData in pendingInputs:
+            inputPort.deserialize(self, inputData)
+
+        return deserializedNodes
+
+    def serializeToBinaryFile(self, file: typing.BinaryIO) -> None:
+        """ Writes the graph in the binary format of KSGraphBinary, holding the same data as serializeToFile(). """
+        KSGraphBinaryWriter().write(file, [node.serialize() for node in self._nodes.values()])
+
+    def deserializeFromBinaryFile(self, file: typing.BinaryIO) -> typing.List[KSNode]:
+        """ Binary counterpart of deserializeFromFile(), the file is memory mapped and connections are resolved by node index. """
+        deserializedNodes = []
+
+        with KSGraphBinaryReader(file) as reader:
+            nodes = [None] * reader.nodeCount()
+            for index in range(reader.nodeCount()):
+                typeIdentifier, uniqueIdentifier, position = reader.node(index)
+                node = KSNode.deserialize(self, { 'typeIdentifier': typeIdentifier, 'UUID': uniqueIdentifier, 'position': position })
+                if (node == None or not self.addNode(node)):
+                    continue
+                nodes[index] = node
+                deserializedNodes.append(node)
+
+            for index, node in enumerate(nodes):
+                if (node == None):
+                    continue
+                for inputKey, providerIndex, providerUUID, providerOutputKey, manualData in reader.inputs(index):
+                    if (inputKey not in node._inputs):
+                        continue
+                    node._inputs[inputKey]._manualData = manualData
+
+                    provider = nodes[providerIndex] if providerIndex != None else self.getNode(providerUUID)
+                    if (provider != None and providerOutputKey in provider._outputs):
+                        node._inputs[inputKey].connect(provider._outputs[providerOutputKey])
+
+        return deserializedNodes
+    # endregion
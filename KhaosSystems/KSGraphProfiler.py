@@ -0,0 +1,93 @@
+import typing
+import threading
+import time
+import sys
+
+from .KSGraphModel import KSNode
+
+class KSNodeProfile(object):
+    _wallTime: float = 0.0
+    _cpuTime: float = 0.0
+    _callCount: int = 0
+    _outputSize: int = 0
+
+    def wallTime(self) -> float:
+        """ Accumulated wall time in seconds. """
+        return self._wallTime
+
+    def cpuTime(self) -> float:
+        """ Accumulated CPU time in seconds, of the thread the node executed on. """
+        return self._cpuTime
+
+    def callCount(self) -> int:
+        return self._callCount
+
+    def outputSize(self) -> int:
+        """ Shallow size in bytes of the output data of the last execution. """
+        return self._outputSize
+
+    def averageWallTime(self) -> float:
+        return self._wallTime / self._callCount if self._callCount > 0 else 0.0
+
+    def serialize(self) -> object:
+        return {
+            'wallTime': self._wallTime,
+            'cpuTime': self._cpuTime,
+            'callCount': self._callCount,
+            'outputSize': self._outputSize
+        }
+
+class KSGraphProfiler(object):
+    """ Collects execution statistics per node, keyed by the node's UUID. """
+    _profiles: typing.Dict[str, KSNodeProfile] = None
+    _lock: threading.Lock = None
+    # Wall times only accumulate until reset(), so the maximum is kept up to date in record().
+    _maxWallTime: float = 0.0
+
+    def __init__(self) -> None:
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def measure(self, node: KSNode, function: typing.Callable[[], typing.Any]) -> typing.Any:
+        wallStart, cpuStart = time.perf_counter(), time.thread_time()
+        result = function()
+        self.record(node, time.perf_counter() - wallStart, time.thread_time() - cpuStart)
+        return result
+
+    async def measureAsync(self, node: KSNode, coroutine: typing.Coroutine) -> typing.Any:
+        # CPU time is left out, other tasks run on the same thread while the node is awaiting.
+        wallStart = time.perf_counter()
+        result = await coroutine
+        self.record(node, time.perf_counter() - wallStart, 0.0)
+        return result
+
+    def record(self, node: KSNode, wallTime: float, cpuTime: float) -> None:
+        outputSize = sum([sys.getsizeof(node._outputs[outputKey].data()) for outputKey in node._outputs])
+
+        with self._lock:
+            profile = self._profiles.get(node.uniqueIdentifier(), None)
+            if (profile == None):
+                profile = KSNodeProfile()
+                self._profiles[node.uniqueIdentifier()] = profile
+
+            profile._wallTime += wallTime
+            profile._cpuTime += cpuTime
+            profile._callCount += 1
+            profile._outputSize = outputSize
+            self._maxWallTime = max(self._maxWallTime, profile._wallTime)
+
+    def profile(self, uniqueIdentifier: str) -> KSNodeProfile:
+        return self._profiles.get(uniqueIdentifier, None)
+
+    def stats(self) -> typing.Dict[str, object]:
+        """ Returns {nodeUUID: {'wallTime', 'cpuTime', 'callCount', 'outputSize'}}. """
+        with self._lock:
+            return { uniqueIdentifier:self._profiles[uniqueIdentifier].serialize() for uniqueIdentifier in self._profiles }
+
+    def maxWallTime(self) -> float:
+        return self._maxWallTime
+
+    def reset(self) -> None:
+        with self._lock:
+            self._profiles = {}
+            self._maxWallTime = 0.0
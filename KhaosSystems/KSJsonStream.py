@@ -0,0 +1,119 @@
+import typing
+import json
+
+def writeJsonItems(file: typing.TextIO, items: typing.Iterable[typing.Any], arrayKey: str = 'items') -> None:
+    """ Writes {arrayKey: [...items]} one item at a time, the counterpart of KSJsonItemStreamReader. """
+    file.write('{' + json.dumps(arrayKey) + ': [')
+    for index, item in enumerate(items):
+        if (index > 0):
+            file.write(', ')
+        file.write(json.dumps(item))
+    file.write(']}')
+
+class KSJsonItemStreamReader(object):
+    """
+    Incrementally parses a top level JSON object from a text file and yields the elements of one of its array members
+    as they are parsed, so the file never has to be held in memory as a whole.
+    Other members are parsed normally and available through members() once the stream is exhausted.
+    """
+    _file: typing.TextIO = None
+    _arrayKey: str = None
+    _chunkSize: int = None
+    _buffer: str = ""
+    _index: int = 0
+    _eof: bool = False
+    _decoder: json.JSONDecoder = None
+    _members: typing.Dict[str, typing.Any] = None
+
+    def __init__(self, file: typing.TextIO, arrayKey: str = 'items', chunkSize: int = 1024 * 1024) -> None:
+        self._file = file
+        self._arrayKey = arrayKey
+        self._chunkSize = chunkSize
+        self._decoder = json.JSONDecoder()
+        self._members = {}
+
+    def members(self) -> typing.Dict[str, typing.Any]:
+        return self._members
+
+    def items(self) -> typing.Iterator[typing.Any]:
+        self.expect('{')
+        if (self.peek() == '}'):
+            self._index += 1
+            return
+
+        while True:
+            key = self.decodeValue()
+            self.expect(':')
+            if (key == self._arrayKey and self.peek() == '['):
+                self._index += 1
+                self._members[key] = None
+                yield from self.arrayItems()
+            else:
+                self._members[key] = self.decodeValue()
+
+            if (self.peek() == ','):
+                self._index += 1
+            else:
+                self.expect('}')
+                return
+
+    def arrayItems(self) -> typing.Iterator[typing.Any]:
+        if (self.peek() == ']'):
+            self._index += 1
+            return
+
+        while True:
+            yield self.decodeValue()
+            if (self.peek() == ','):
+                self._index += 1
+            else:
+                self.expect(']')
+                return
+
+    # region Buffer handling
+    def fill(self) -> bool:
+        """ Reads the next chunk, dropping the consumed part of the buffer. Returns False at the end of the file. """
+        if (self._eof):
+            return False
+
+        chunk = self._file.read(self._chunkSize)
+        if (chunk == ""):
+            self._eof = True
+            return False
+
+        self._buffer = self._buffer[self._index:] + chunk
+        self._index = 0
+        return True
+
+    def peek(self) -> str:
+        """ Returns the next non whitespace character without consuming it. """
+        while True:
+            while (self._index < len(self._buffer) and self._buffer[self._index] in " \t\n\r"):
+                self._index += 1
+            if (self._index < len(self._buffer)):
+                return self._buffer[self._index]
+            if (not self.fill()):
+                raise ValueError("Unexpected end of JSON stream.")
+
+    def expect(self, character: str) -> None:
+        if (self.peek() != character):
+            raise ValueError(f"Expected '{character}' at JSON stream position {self._index}, got '{self._buffer[self._index]}'.")
+        self._index += 1
+
+    def decodeValue(self) -> typing.Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._index)
+                # A number running up to the end of the buffer may continue in the next chunk.
+                if (self._eof or not isinstance(value, (int, float)) or self._buffer[end:].strip("0123456789+-.eE") != ""):
+                    self._index = end
+                    return value
+            except json.JSONDecodeError:
+                if (self._eof):
+                    raise
+            if (not self.fill()):
+                # Nothing more to read, decode what is there (or raise the actual error).
+                value, self._index = self._decoder.raw_decode(self._buffer, self._index)
+                return value
+    # endregion
@@ -0,0 +1,203 @@
+import typing
+import collections
+import hashlib
+import types
+import pickle
+import os
+
+from .KSGraphModel import KSNode
+
+class KSNodeResultCache(object):
+    """
+    Content addressed cache of node output data, keyed by node type, code version and a hash of the input data.
+    Entries are kept pickled in memory, least recently used entries are evicted once the memory budget is exceeded.
+    When a disk directory is set, entries are also written there so they survive across sessions.
+    Only pure nodes (see KSNode._pure) are cached.
+    """
+    _memoryBudget: int = None
+    _memoryUsage: int = 0
+    _entries: typing.Dict[str, bytes] = None
+    _diskDirectory: str = None
+    _codeVersions: typing.Dict[type, str] = None
+
+    _hits: int = 0
+    _diskHits: int = 0
+    _misses: int = 0
+    _evictions: int = 0
+
+    def __init__(self, memoryBudget: int = 64 * 1024 * 1024, diskDirectory: str = None) -> None:
+        self._memoryBudget = memoryBudget
+        self._entries = collections.OrderedDict()
+        self._codeVersions = {}
+        self.setDiskDirectory(diskDirectory)
+
+    def setMemoryBudget(self, memoryBudget: int) -> None:
+        self._memoryBudget = memoryBudget
+        self.evict()
+
+    def memoryBudget(self) -> int:
+        return self._memoryBudget
+
+    def memoryUsage(self) -> int:
+        return self._memoryUsage
+
+    def setDiskDirectory(self, diskDirectory: str) -> None:
+        self._diskDirectory = diskDirectory
+        if (self._diskDirectory != None):
+            os.makedirs(self._diskDirectory, exist_ok=True)
+
+    def diskDirectory(self) -> str:
+        return self._diskDirectory
+
+    # region Statistics
+    def hits(self) -> int:
+        return self._hits
+
+    def diskHits(self) -> int:
+        return self._diskHits
+
+    def misses(self) -> int:
+        return self._misses
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {
+            'hits': self._hits,
+            'diskHits': self._diskHits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+            'entries': len(self._entries),
+            'memoryUsage': self._memoryUsage,
+            'memoryBudget': self._memoryBudget
+        }
+
+    def resetStats(self) -> None:
+        self._hits, self._diskHits, self._misses, self._evictions = 0, 0, 0, 0
+    # endregion
+
+    def codeVersion(self, nodeType: type) -> str:
+        codeVersion = self._codeVersions.get(nodeType, None)
+        if (codeVersion == None):
+            executeCode = nodeType.execute.__code__
+            digest = hashlib.sha256()
+            digest.update(str(nodeType._version).encode())
+            self.hashCode(digest, executeCode)
+            codeVersion = digest.hexdigest()
+            self._codeVersions[nodeType] = codeVersion
+        return codeVersion
+
+    @classmethod
+    def hashCode(cls, digest: "hashlib._Hash", code: types.CodeType) -> None:
+        """ Hashes the bytecode, names and constants of the code, nested code objects included; never memory addresses. """
+        digest.update(code.co_code)
+        digest.update(repr(code.co_names).encode())
+        for constant in code.co_consts:
+            cls.hashConstant(digest, constant)
+
+    @classmethod
+    def hashConstant(cls, digest: "hashlib._Hash", constant: typing.Any) -> None:
+        if (isinstance(constant, types.CodeType)):
+            digest.update(b"code(")
+            cls.hashCode(digest, constant)
+            digest.update(b")")
+        elif (isinstance(constant, (tuple, frozenset))):
+            # Frozenset order (and so its repr) changes with the hash seed of the process.
+            items = constant if isinstance(constant, tuple) else sorted(constant, key=repr)
+            digest.update(type(constant).__name__.encode() + b"(")
+            for item in items:
+                cls.hashConstant(digest, item)
+            digest.update(b")")
+        else:
+            digest.update(repr(constant).encode() + b",")
+
+    def key(self, node: KSNode) -> str:
+        """ Returns the cache key for the node's current input data, or None if the node can't be cached. """
+        if (not node._pure):
+            return None
+
+        try:
+            inputData = pickle.dumps([(inputKey, node._inputs[inputKey].data()) for inputKey in sorted(node._inputs)], protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return None
+
+        digest = hashlib.sha256()
+        digest.update(node.typeIdentifier().encode())
+        digest.update(self.codeVersion(type(node)).encode())
+        digest.update(inputData)
+        return digest.hexdigest()
+
+    def load(self, node: KSNode) -> bool:
+        """ Sets the node's output data from the cache, returns False on a cache miss. """
+        key = self.key(node)
+        if (key == None):
+            return False
+
+        entry = self._entries.get(key, None)
+        if (entry != None):
+            self._entries.move_to_end(key)
+            self._hits += 1
+        else:
+            entry = self.loadFromDisk(key)
+            if (entry == None):
+                self._misses += 1
+                return False
+            self._diskHits += 1
+            self.insert(key, entry)
+
+        outputData = pickle.loads(entry)
+        for outputKey in outputData:
+            node._outputs[outputKey].setData(outputData[outputKey])
+
+        return True
+
+    def store(self, node: KSNode) -> None:
+        key = self.key(node)
+        if (key == None):
+            return
+
+        try:
+            entry = pickle.dumps({ outputKey:node._outputs[outputKey].data() for outputKey in node._outputs }, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+
+        self.insert(key, entry)
+        self.storeToDisk(key, entry)
+
+    def insert(self, key: str, entry: bytes) -> None:
+        if (key in self._entries):
+            self._memoryUsage -= len(self._entries.pop(key))
+
+        self._entries[key] = entry
+        self._memoryUsage += len(entry)
+        self.evict()
+
+    def evict(self) -> None:
+        while (self._memoryUsage > self._memoryBudget and len(self._entries) > 0):
+            _, entry = self._entries.popitem(last=False)
+            self._memoryUsage -= len(entry)
+            self._evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._memoryUsage = 0
+
+    # region Disk tier
+    def diskPath(self, key: str) -> str:
+        return os.path.join(self._diskDirectory, key + ".pickle")
+
+    def loadFromDisk(self, key: str) -> bytes:
+        if (self._diskDirectory == None or not os.path.isfile(self.diskPath(key))):
+            return None
+
+        with open(self.diskPath(key), "rb") as file:
+            return file.read()
+
+    def storeToDisk(self, key: str, entry: bytes) -> None:
+        if (self._diskDirectory == None):
+            return
+
+        # Write to a temporary file first, so other sessions never read a partially written entry.
+        temporaryPath = self.diskPath(key) + f".{os.getpid()}.tmp"
+        with open(temporaryPath, "wb") as file:
+            file.write(entry)
+        os.replace(temporaryPath, self.diskPath(key))
+    # endregion
@@ -1,10 +1,50 @@
 from PySide2 import QtCore, QtWidgets, QtGui
 from enum import Enum
 import typing
-import json
-import uuid
 import sys
 import importlib
+import asyncio
+import contextlib
+import tempfile
+import array
+import math
+import os
+
+from .KSGraphModel import KSGraph, KSNode, KSNodeInputPort, KSNodeOutputPort
+from .KSGraphExecutor import KSGraphExecutor
+from .KSGraphProfiler import KSGraphProfiler
+from .KSGraphJournal import KSGraphJournal
+from .KSGraphAutosave import KSGraphAutosaver
+from .KSSpatialIndex import KSSpatialHash
+
+GRAPH_FILE_FILTER = "Graph Files (*.json *.ksg);;Json Files (*.json);;Binary Graph Files (*.ksg)"
+
+# Lazy materialization; node positions are indexed in cells of this size, and a node is assumed to span at most
+# NODE_EXTENT from its position when deciding whether it's close to the visible rect.
+NODE_INDEX_CELL_SIZE = 2048
+NODE_EXTENT = 512
+# Nodes outside the near rect materialized at most for their connections to nodes inside it, the closest first, so
+# a high fan-out hub doesn't materialize its whole neighbourhood.
+NODE_NEIGHBOUR_LIMIT = 256
+
+# Pixmap cache budget in bytes wanted by node item caching, room for a few hundred node pixmaps at 1:1 scale.
+NODE_CACHE_BUDGET = 128 * 1024 * 1024
+
+# Connection paths of moved nodes are updated at most once per frame (in milliseconds, ~60 Hz) instead of on every
+# mouse move event, see KSNodeGraph.schedulePathUpdate().
+PATH_UPDATE_INTERVAL = 16
+
+# Port centres are indexed in cells of this size, see KSNodeScene.portAt().
+PORT_INDEX_CELL_SIZE = 256
+# Distance in view pixels from a port's edge within which a dragged connection snaps to it.
+PORT_SNAP_RADIUS = 24
+
+# Grid background tiles cached by pixel size, and the largest tile before the grid is drawn directly instead.
+GRID_TILE_CACHE_SIZE = 16
+GRID_TILE_MAX_SIZE = 1024
+
+# Segments a connection curve is approximated with when hit testing, see KSConnectionLayer.edgeAt().
+CONNECTION_HIT_TEST_SEGMENTS = 16
 
 class KSColor(object):
     r: int = 0
@@ -30,12 +70,32 @@ class KSStyleingData(object):
     COLOR_DATATYPE_VOID: KSColor = KSColor(255, 255, 255)
     COLOR_DATATYPE_STRING: KSColor = KSColor(0, 194, 255)
     COLOR_DATATYPE_MATRIX: KSColor = KSColor(255, 170, 0)
+    COLOR_PROFILER_COLD: KSColor = KSColor(0, 150, 60, 170)
+    COLOR_PROFILER_HOT: KSColor = KSColor(220, 40, 0, 170)
+    COLOR_GRID_MINOR: KSColor = KSColor(255, 255, 255, 10)
+    COLOR_GRID_MAJOR: KSColor = KSColor(255, 255, 255, 22)
 
     SCALAR_NODE_BORDER_SIZE = 4
     SCALAR_NODE_BORDER_RADIUS = 16
     SCALAR_NODE_PARAMETER_SPACEING = 10
     SCALAR_NODE_PARAMETER_DIAMETER = 30
 
+    # Level of detail thresholds, in view scale. Below SIMPLIFIED nodes are flat rects without separators, port
+    # labels and manual input widgets; below MINIMAL titles and ports are skipped too and connections are straight lines.
+    SCALAR_LOD_SIMPLIFIED = 0.5
+    SCALAR_LOD_MINIMAL = 0.25
+
+    # Grid background; minor cell size in scene units, minor cells per major cell, major line width in pixels.
+    # Lines fade out as their on screen spacing shrinks from FADE_MAX to FADE_MIN pixels.
+    SCALAR_GRID_SIZE = 64
+    SCALAR_GRID_MAJOR_SUBDIVISIONS = 8
+    SCALAR_GRID_MAJOR_LINE_WIDTH = 2
+    SCALAR_GRID_FADE_MIN = 6
+    SCALAR_GRID_FADE_MAX = 24
+
+def itemLevelOfDetail(painter: QtGui.QPainter, option: QtWidgets.QStyleOptionGraphicsItem) -> float:
+    return option.levelOfDetailFromTransform(painter.worldTransform())
+
 
 STYLE_QMENU = '''
 QMenu {
@@ -58,12 +118,80 @@ QMenu::separator {
 }
 '''
 
+class KSStyleResources(object):
+    """
+    Pens, brushes and fonts built once per style (see KSStyleingData) and shared by every item drawn with it, instead
+    of every node, port and connection allocating its own. Created on first use, as fonts need a QApplication.
+    """
+    _instances: typing.Dict[type, "KSStyleResources"] = {}
+
+    nodeBrush: QtGui.QBrush = None
+    nodePen: QtGui.QPen = None
+    nodeSelectedPen: QtGui.QPen = None
+    separatorPen: QtGui.QPen = None
+    textPen: QtGui.QPen = None
+    nodeTextFont: QtGui.QFont = None
+    profilerTextFont: QtGui.QFont = None
+
+    parameterBrush: QtGui.QBrush = None
+    parameterPen: QtGui.QPen = None
+    parameterTextFont: QtGui.QFont = None
+
+    connectionBackgroundPen: QtGui.QPen = None
+    connectionInfillPen: QtGui.QPen = None
+
+    @classmethod
+    def forStyle(cls, style: type) -> "KSStyleResources":
+        resources = cls._instances.get(style, None)
+        if (resources == None):
+            resources = cls(style)
+            cls._instances[style] = resources
+        return resources
+
+    def __init__(self, style: type) -> None:
+        self.nodeBrush = QtGui.QBrush(style.COLOR_NODE_BACKGROUND.toQColor(), QtCore.Qt.SolidPattern)
+        self.nodePen = self.createPen(style.COLOR_NODE_BORDER, style.SCALAR_NODE_BORDER_SIZE)
+        self.nodeSelectedPen = self.createPen(style.COLOR_NODE_BORDER_SELECTED, style.SCALAR_NODE_BORDER_SIZE)
+        self.separatorPen = self.createPen(style.COLOR_NODE_BORDER, style.SCALAR_NODE_BORDER_SIZE / 2)
+        self.textPen = QtGui.QPen(style.COLOR_NODE_TEXT.toQColor())
+        self.nodeTextFont = QtGui.QFont("Hack", 24, QtGui.QFont.Normal)
+        self.profilerTextFont = QtGui.QFont("Hack", 10, QtGui.QFont.Normal)
+
+        self.parameterBrush = QtGui.QBrush(style.COLOR_DATATYPE_STRING.toQColor(), QtCore.Qt.SolidPattern)
+        self.parameterPen = self.createPen(style.COLOR_NODE_BORDER, style.SCALAR_NODE_BORDER_SIZE)
+        self.parameterTextFont = QtGui.QFont("Hack", 14, QtGui.QFont.Normal)
+
+        self.connectionBackgroundPen = self.createPen(style.COLOR_NODE_BORDER, style.SCALAR_NODE_BORDER_SIZE * 3)
+        self.connectionInfillPen = self.createPen(style.COLOR_DATATYPE_STRING, style.SCALAR_NODE_BORDER_SIZE)
+
+    @staticmethod
+    def createPen(color: KSColor, width: float) -> QtGui.QPen:
+        pen = QtGui.QPen(color.toQColor())
+        pen.setStyle(QtCore.Qt.SolidLine)
+        pen.setWidthF(width)
+        return pen
+
 # TODO: Make a master class of this.
 class KSGraphicsStringInput(QtWidgets.QGraphicsTextItem):
+    _dataChangedCallback: typing.Callable[[str], None] = None
+
     def __init__(self, text: str, parent: typing.Optional[QtWidgets.QGraphicsItem] = ...) -> None:
         super().__init__(text, parent=parent)
 
         self.setTextInteractionFlags(QtCore.Qt.TextEditable)
+        self.document().contentsChanged.connect(self.onContentsChanged)
+
+    def setDataChangedCallback(self, callback: typing.Callable[[str], None]) -> None:
+        self._dataChangedCallback = callback
+
+    def onContentsChanged(self) -> None:
+        if (self._dataChangedCallback != None):
+            self._dataChangedCallback(self.data())
+
+    def paint(self, painter: QtGui.QPainter, option: QtWidgets.QStyleOptionGraphicsItem, widget: typing.Optional[QtWidgets.QWidget] = ...) -> None:
+        if (itemLevelOfDetail(painter, option) < KSStyleingData.SCALAR_LOD_SIMPLIFIED):
+            return
+        super().paint(painter, option, widget)
 
     def setData(self, data: str) -> None:
         self.setPlainText(data)
@@ -73,6 +201,7 @@ class KSGraphicsStringInput(QtWidgets.QGraphicsTextItem):
 
 class KSGraphicsBoolInput(QtWidgets.QGraphicsItem):
     _data: bool = False
+    _dataChangedCallback: typing.Callable[[bool], None] = None
 
     def __init__(self, parent: QtWidgets.QGraphicsItem) -> None:
         super().__init__(parent=parent)
@@ -81,6 +210,8 @@ class KSGraphicsBoolInput(QtWidgets.QGraphicsItem):
         return QtCore.QRectF(0, 0, 15, 15)
 
     def paint(self, painter: QtGui.QPainter, option: QtWidgets.QStyleOptionGraphicsItem, widget: typing.Optional[QtWidgets.QWidget] = ...) -> None:
+        if (itemLevelOfDetail(painter, option) < KSStyleingData.SCALAR_LOD_SIMPLIFIED):
+            return
         if (self._data):
             painter.fillRect(self.boundingRect(), QtCore.Qt.green)
         else:
@@ -91,36 +222,51 @@ class KSGraphicsBoolInput(QtWidgets.QGraphicsItem):
         self._data = not self._data
         self.update()
 
+        if (self._dataChangedCallback != None):
+            self._dataChangedCallback(self._data)
+
+    def setDataChangedCallback(self, callback: typing.Callable[[bool], None]) -> None:
+        self._dataChangedCallback = callback
+
     def setData(self, data: bool) -> None:
         self._data = data
+        self.update()
 
     def data(self) -> bool:
         return self._data
 
+def appendConnectionCurve(path: QtGui.QPainterPath, originX: float, originY: float, targetX: float, targetY: float) -> None:
+    """ Appends the curve of a connection going from origin (an output) to target (an input). """
+    dx = (targetX - originX) * 0.5
+    path.moveTo(originX, originY)
+    path.cubicTo(originX + dx, originY, originX + dx, targetY, targetX, targetY)
+
 class KSNodeConnectionPath(QtWidgets.QGraphicsPathItem):
     _originPoint: QtCore.QPointF = None
     _targetPoint: QtCore.QPointF = None
     _path: QtGui.QPainterPath = None
-    _backgroundPen: QtGui.QPen = None
-    _infillPen: QtGui.QPen = None
+    _style: type = KSStyleingData
+    _resources: KSStyleResources = None
     
     def __init__(self, originPoint: QtCore.QPointF, targetPoint: QtCore.QPointF) -> None:
         super().__init__()
 
-        self._backgroundPen = QtGui.QPen(KSStyleingData.COLOR_NODE_BORDER.toQColor())
-        self._backgroundPen.setWidth(KSStyleingData.SCALAR_NODE_BORDER_SIZE*3)
-        self.setPen(self._backgroundPen)
-
-        self._infillPen = QtGui.QPen(KSStyleingData.COLOR_DATATYPE_STRING.toQColor())
-        self._infillPen.setWidth(KSStyleingData.SCALAR_NODE_BORDER_SIZE)
+        self._resources = KSStyleResources.forStyle(self._style)
+        self.setPen(self._resources.connectionBackgroundPen)
 
         self.updatePath(originPoint, targetPoint)
 
     def paint(self, painter: QtGui.QPainter, option: QtWidgets.QStyleOptionGraphicsItem, widget: typing.Optional[QtWidgets.QWidget] = ...) -> None:
         # self.updatePath(self._originPoint, self._targetPoint)
-        painter.setPen(self._backgroundPen)
+        if (itemLevelOfDetail(painter, option) < KSStyleingData.SCALAR_LOD_MINIMAL):
+            painter.setRenderHint(QtGui.QPainter.Antialiasing, False)
+            painter.setPen(self._resources.connectionInfillPen)
+            painter.drawLine(self._originPoint, self._targetPoint)
+            return
+
+        painter.setPen(self._resources.connectionBackgroundPen)
         painter.drawPath(self._path)
-        painter.setPen(self._infillPen)
+        painter.setPen(self._resources.connectionInfillPen)
         painter.drawPath(self._path)
 
     def updatePath(self, originPoint: QtCore.QPointF, targetPoint: QtCore.QPointF) -> None:
@@ -128,172 +274,328 @@ class KSNodeConnectionPath(QtWidgets.QGraphicsPathItem):
         self._targetPoint = targetPoint
 
         path = QtGui.QPainterPath()
-        path.moveTo(self._originPoint)
-        dx = (self._targetPoint.x() - self._originPoint.x()) * 0.5
-        dy = self._targetPoint.y() - self._originPoint.y()
-        ctrl1 = QtCore.QPointF(self._originPoint.x() + dx, self._originPoint.y() + dy * 0)
-        ctrl2 = QtCore.QPointF(self._originPoint.x() + dx, self._originPoint.y() + dy * 1)
-        path.cubicTo(ctrl1, ctrl2, self._targetPoint)
+        appendConnectionCurve(path, self._originPoint.x(), self._originPoint.y(), self._targetPoint.x(), self._targetPoint.y())
         self._path = path
 
         # For some reason, removeing this breaks everything.
         # FIXME: Figure out why, here are the docs; good luck... https://code.woboq.org/qt5/qtbase/src/widgets/graphicsview/qgraphicsitem.cpp.html#_ZN17QGraphicsPathItem5paintEP8QPainterPK24QStyleOptionGraphicsItemP7QWidget
         self.setPath(path)
 
+class KSConnectionLayer(QtWidgets.QGraphicsItem):
+    """
+    Draws every connection of a scene as a single item. Edge endpoints are kept in flat arrays indexed by edge, edges
+    outside the exposed rect are skipped and the rest is drawn grouped by pen, instead of one item per edge.
+    The layer itself never takes mouse hits; edgeAt() does per edge hit testing.
+    """
+    FREE_EDGE = 0xFFFF
+
+    # originX, originY, targetX, targetY per edge.
+    _coordinates: array.array = None
+    # Index into _pens per edge, FREE_EDGE for removed edges.
+    _penIndices: array.array = None
+    _pens: typing.List[QtGui.QPen] = None
+    _freeEdges: typing.List[int] = None
+    _edgeCount: int = 0
+    # Grown as edges are added or moved, shrinking it would re-index the layer on every drag.
+    _bounds: QtCore.QRectF = None
+
+    _style: type = KSStyleingData
+    _resources: KSStyleResources = None
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._resources = KSStyleResources.forStyle(self._style)
+        self._coordinates = array.array('d')
+        self._penIndices = array.array('H')
+        self._pens = []
+        self._freeEdges = []
+        self._bounds = QtCore.QRectF()
+
+        self.setFlag(QtWidgets.QGraphicsItem.ItemUsesExtendedStyleOption)
+        self.setAcceptedMouseButtons(QtCore.Qt.NoButton)
+        self.setZValue(-1)
+
+    def edgeCount(self) -> int:
+        return self._edgeCount
+
+    def penIndex(self, pen: QtGui.QPen) -> int:
+        for index in range(len(self._pens)):
+            if (self._pens[index] == pen):
+                return index
+        self._pens.append(QtGui.QPen(pen))
+        return len(self._pens) - 1
+
+    def addEdge(self, originPoint: QtCore.QPointF, targetPoint: QtCore.QPointF, pen: QtGui.QPen = None) -> int:
+        """ Adds a connection from origin (an output) to target (an input), drawn with pen over the background pen. """
+        penIndex = self.penIndex(pen if pen != None else self._resources.connectionInfillPen)
+        if (len(self._freeEdges) > 0):
+            edge = self._freeEdges.pop()
+            self._penIndices[edge] = penIndex
+        else:
+            edge = len(self._penIndices)
+            self._penIndices.append(penIndex)
+            self._coordinates.extend((0.0, 0.0, 0.0, 0.0))
+        self._edgeCount += 1
+
+        self.setEdgeCoordinates(edge, originPoint, targetPoint)
+        return edge
+
+    def updateEdge(self, edge: int, originPoint: QtCore.QPointF, targetPoint: QtCore.QPointF) -> None:
+        self.update(self.edgeRect(edge))
+        self.setEdgeCoordinates(edge, originPoint, targetPoint)
+
+    def removeEdge(self, edge: int) -> None:
+        if (self._penIndices[edge] == self.FREE_EDGE):
+            return
+
+        self.update(self.edgeRect(edge))
+        self._penIndices[edge] = self.FREE_EDGE
+        self._freeEdges.append(edge)
+        self._edgeCount -= 1
+
+    def clear(self) -> None:
+        self._coordinates = array.array('d')
+        self._penIndices = array.array('H')
+        self._freeEdges = []
+        self._edgeCount = 0
+        self.update()
+
+    def setEdgeCoordinates(self, edge: int, originPoint: QtCore.QPointF, targetPoint: QtCore.QPointF) -> None:
+        offset = edge * 4
+        self._coordinates[offset:offset + 4] = array.array('d', (originPoint.x(), originPoint.y(), targetPoint.x(), targetPoint.y()))
+
+        edgeRect = self.edgeRect(edge)
+        if (not self._bounds.contains(edgeRect)):
+            self.prepareGeometryChange()
+            self._bounds |= edgeRect
+        self.update(edgeRect)
+
+    def edgeRect(self, edge: int) -> QtCore.QRectF:
+        """ Bounds of the edge including its pen; the curve's control points never leave the rect of its endpoints. """
+        originX, originY, targetX, targetY = self._coordinates[edge * 4:edge * 4 + 4]
+        margin = self._resources.connectionBackgroundPen.widthF() / 2
+        return QtCore.QRectF(min(originX, targetX) - margin, min(originY, targetY) - margin, abs(targetX - originX) + margin * 2, abs(targetY - originY) + margin * 2)
+
+    def edgesIn(self, rect: QtCore.QRectF) -> typing.List[int]:
+        """ Returns the edges whose bounds intersect the rect. """
+        margin = self._resources.connectionBackgroundPen.widthF() / 2
+        left, top, right, bottom = rect.left() - margin, rect.top() - margin, rect.right() + margin, rect.bottom() + margin
+
+        coordinates = self._coordinates
+        edges = []
+        for edge, penIndex in enumerate(self._penIndices):
+            if (penIndex == self.FREE_EDGE):
+                continue
+            offset = edge * 4
+            originX, originY, targetX, targetY = coordinates[offset], coordinates[offset + 1], coordinates[offset + 2], coordinates[offset + 3]
+            if ((originX < left and targetX < left) or (originX > right and targetX > right) or (originY < top and targetY < top) or (originY > bottom and targetY > bottom)):
+                continue
+            edges.append(edge)
+        return edges
+
+    def edgePath(self, edge: int) -> QtGui.QPainterPath:
+        path = QtGui.QPainterPath()
+        appendConnectionCurve(path, *self._coordinates[edge * 4:edge * 4 + 4])
+        return path
+
+    def edgeAt(self, point: QtCore.QPointF, tolerance: float = None) -> typing.Optional[int]:
+        """ Returns the edge closest to point within tolerance (by default the background pen's half width), or None. """
+        if (tolerance == None):
+            tolerance = self._resources.connectionBackgroundPen.widthF() / 2
+
+        x, y = point.x(), point.y()
+        closestEdge, closestDistance = None, tolerance
+        for edge in self.edgesIn(QtCore.QRectF(x - tolerance, y - tolerance, tolerance * 2, tolerance * 2)):
+            originX, originY, targetX, targetY = self._coordinates[edge * 4:edge * 4 + 4]
+            controlX = originX + (targetX - originX) * 0.5
+
+            # Distance to the curve approximated by line segments, see appendConnectionCurve() for the control points.
+            lastX, lastY = originX, originY
+            for segment in range(1, CONNECTION_HIT_TEST_SEGMENTS + 1):
+                t = segment / CONNECTION_HIT_TEST_SEGMENTS
+                a, b, c, d = (1 - t) ** 3, 3 * (1 - t) ** 2 * t, 3 * (1 - t) * t ** 2, t ** 3
+                segmentX = a * originX + (b + c) * controlX + d * targetX
+                segmentY = (a + b) * originY + (c + d) * targetY
+
+                lengthSquared = (segmentX - lastX) ** 2 + (segmentY - lastY) ** 2
+                projection = 0 if lengthSquared == 0 else max(0, min(1, ((x - lastX) * (segmentX - lastX) + (y - lastY) * (segmentY - lastY)) / lengthSquared))
+                distance = math.hypot(x - (lastX + projection * (segmentX - lastX)), y - (lastY + projection * (segmentY - lastY)))
+                if (distance <= closestDistance):
+                    closestEdge, closestDistance = edge, distance
+                lastX, lastY = segmentX, segmentY
+        return closestEdge
+
+    def boundingRect(self) -> QtCore.QRectF:
+        return self._bounds
+
+    def shape(self) -> QtGui.QPainterPath:
+        return QtGui.QPainterPath()
+
+    def paint(self, painter: QtGui.QPainter, option: QtWidgets.QStyleOptionGraphicsItem, widget: typing.Optional[QtWidgets.QWidget] = ...) -> None:
+        edges = self.edgesIn(option.exposedRect)
+        if (len(edges) == 0):
+            return
+
+        coordinates = self._coordinates
+        if (itemLevelOfDetail(painter, option) < KSStyleingData.SCALAR_LOD_MINIMAL):
+            painter.setRenderHint(QtGui.QPainter.Antialiasing, False)
+            lines = [[] for pen in self._pens]
+            for edge in edges:
+                lines[self._penIndices[edge]].append(QtCore.QLineF(*coordinates[edge * 4:edge * 4 + 4]))
+            for penIndex in range(len(self._pens)):
+                if (len(lines[penIndex]) > 0):
+                    painter.setPen(self._pens[penIndex])
+                    painter.drawLines(lines[penIndex])
+            return
+
+        # The background pen is shared, draw all of it first so infills are never covered by another edge's background.
+        # Every edge is still its own path; stroking one path of many crossing curves is far slower in the raster engine.
+        paths = [[] for pen in self._pens]
+        for edge in edges:
+            path = QtGui.QPainterPath()
+            appendConnectionCurve(path, *coordinates[edge * 4:edge * 4 + 4])
+            paths[self._penIndices[edge]].append(path)
+
+        painter.setBrush(QtCore.Qt.NoBrush)
+        painter.setPen(self._resources.connectionBackgroundPen)
+        for penPaths in paths:
+            for path in penPaths:
+                painter.drawPath(path)
+        for penIndex in range(len(self._pens)):
+            if (len(paths[penIndex]) > 0):
+                painter.setPen(self._pens[penIndex])
+                for path in paths[penIndex]:
+                    painter.drawPath(path)
+
 class KSNodeInput(QtWidgets.QGraphicsItem):
-    _datatype: type = None
+    _port: KSNodeInputPort = None
     _connection: "KSNodeOutput" = None
-    _connectionPath: KSNodeConnectionPath = None
+    # Edge of the connection in the scene's KSConnectionLayer.
+    _edge: int = None
     _manualInput: KSGraphicsStringInput = None
 
-    _uniqueIdentifier: str = None
-
-    _brush: QtGui.QBrush = None
-    _pen: QtGui.QPen = None
+    _style: type = KSStyleingData
+    _resources: KSStyleResources = None
 
     _borderWidth: int = None
     _diameter: int = None
 
-    _textPen: QtGui.QPen = None
-    _nodeTextFont: QtGui.QFont = None
-
-    def __init__(self, parent: "KSNodeItem", datatype: type) -> None:
+    def __init__(self, parent: "KSNodeItem", port: KSNodeInputPort) -> None:
         super().__init__(parent=parent)
-        self._datatype = datatype
+        self._port = port
+        self._resources = KSStyleResources.forStyle(self._style)
 
         self._borderWidth = KSStyleingData.SCALAR_NODE_BORDER_SIZE
         self._diameter = KSStyleingData.SCALAR_NODE_PARAMETER_DIAMETER
 
-        self._brush = QtGui.QBrush()
-        self._brush.setStyle(QtCore.Qt.SolidPattern)
-        self._brush.setColor(KSStyleingData.COLOR_DATATYPE_STRING.toQColor())
-
-        self._pen = QtGui.QPen()
-        self._pen.setStyle(QtCore.Qt.SolidLine)
-        self._pen.setWidth(self._borderWidth)
-        self._pen.setColor(KSStyleingData.COLOR_NODE_BORDER.toQColor())
-
-        self._textPen = QtGui.QPen()
-        self._textPen.setStyle(QtCore.Qt.SolidLine)
-        self._textPen.setColor(KSStyleingData.COLOR_NODE_TEXT.toQColor())
-
-        self._nodeTextFont = QtGui.QFont("Hack", 14, QtGui.QFont.Normal)
-
-        if (self._datatype == str):
-            self._manualInput = KSGraphicsStringInput("L_Joint_jnt", self)
+        if (self._port.datatype() == str):
+            self._manualInput = KSGraphicsStringInput(self._port.manualData(), self)
             self._manualInput.setPos(34 + 150, 0)
-        elif(self._datatype == bool):
+        elif(self._port.datatype() == bool):
             self._manualInput = KSGraphicsBoolInput(self)
+            self._manualInput.setData(self._port.manualData())
             self._manualInput.setPos(34 + 150, 0)
 
+        if (self._manualInput != None):
+            self._manualInput.setDataChangedCallback(self._port.setManualData)
+            # The provider may not have an item (yet), see KSNodeGraph.setLazyMaterialization().
+            if (not self._port.isUsingManualInput()):
+                self._manualInput.hide()
+
+    def port(self) -> KSNodeInputPort:
+        return self._port
+
     def isUsingManualInput(self) -> bool:
-        return self._connection == None
+        return self._port.isUsingManualInput()
 
     def connect(self, output: "KSNodeOutput") -> None:
         if (self._connection != None):
             self.disconnect()
 
+        self._port.connect(output.port())
+        self.bindConnection(output)
+
+    def disconnect(self) -> None:
+        self._port.disconnect()
+        self.unbindConnection()
+
+    def bindConnection(self, output: "KSNodeOutput") -> None:
+        """ Creates the view side of a connection that already exists in the graph model. """
         self._connection = output
         self._connection.onConnect(self)
-        self._manualInput.hide()
+        if (self._manualInput != None):
+            self._manualInput.hide()
 
-        targetPoint = output.scenePos() + output.boundingRect().center()
-        originPoint = self.scenePos() + self.boundingRect().center()
-        self._connectionPath = KSNodeConnectionPath(targetPoint, originPoint)
-        self.scene().addItem(self._connectionPath)
+        originPoint = output.scenePos() + output.boundingRect().center()
+        targetPoint = self.scenePos() + self.boundingRect().center()
+        self._edge = self.scene().connectionLayer().addEdge(originPoint, targetPoint)
+
+    def unbindConnection(self) -> None:
+        if (self._connection == None):
+            return
 
-    def disconnect(self) -> None:
         self._connection.onDisconnect(self)
         self._connection = None
-        self.scene().removeItem(self._connectionPath)
-        self._connectionPath = None
+        self.scene().connectionLayer().removeEdge(self._edge)
+        self._edge = None
+        if (self._manualInput != None and self._port.isUsingManualInput()):
+            self._manualInput.show()
 
     def updatePath(self) -> None:
-        if (self._connectionPath != None):
-            targetPoint = self._connection.scenePos() + self._connection.boundingRect().center()
-            originPoint = self.scenePos() + self.boundingRect().center()
-            self._connectionPath.updatePath(targetPoint, originPoint)
+        if (self._edge != None):
+            originPoint = self._connection.scenePos() + self._connection.boundingRect().center()
+            targetPoint = self.scenePos() + self.boundingRect().center()
+            self.scene().connectionLayer().updateEdge(self._edge, originPoint, targetPoint)
 
     def data(self) -> typing.Any:
-        if (self._connection != None):
-            return self._connection.data()
-        else:
-            return self._manualInput.data()
-
-    def serialize(self) -> object:
-        connectionUUID = ""
-        connectionOutputKey = ""
-        if (self._connection != None):
-            connectionUUID = self._connection.dataProvider().uniqueIdentifier()
-
-            for key in self._connection.dataProvider()._outputs:
-                if (self._connection.dataProvider()._outputs[key] == self._connection):
-                    connectionOutputKey = key
-
-        return {  
-            'manualInputData': self._manualInput.data(),
-            'connectionUUID': connectionUUID,
-            'connectionOutputKey': connectionOutputKey
-            }
-
-    def deserialize(self, nodeGraph: "KSNodeGraph", data: object) -> None:
-        self._manualInput.setData(data['manualInputData'])
-        
-        connection = None
-        for item in nodeGraph.scene().items():
-            if (isinstance(item, KSNodeItem) and item.uniqueIdentifier() == data['connectionUUID'] and data['connectionOutputKey'] in item._outputs):
-                connection = item._outputs[data['connectionOutputKey']]
-
-        if (connection != None):
-            self.connect(connection)
+        return self._port.data()
 
     def boundingRect(self) -> QtCore.QRectF:
         return QtCore.QRectF(0, 0, self._diameter, self._diameter)
 
     def paint(self, painter: QtGui.QPainter, option: QtWidgets.QStyleOptionGraphicsItem, widget: typing.Optional[QtWidgets.QWidget] = ...) -> None:
         #painter.fillRect(self.boundingRect(), QtGui.QColor(0, 0, 255, 255))
-        painter.setBrush(self._brush)
-        painter.setPen(self._pen)
+        levelOfDetail = itemLevelOfDetail(painter, option)
+        if (levelOfDetail < KSStyleingData.SCALAR_LOD_MINIMAL):
+            return
+
+        painter.setBrush(self._resources.parameterBrush)
+        painter.setPen(self._resources.parameterPen)
         painter.drawEllipse(self._borderWidth/2, self._borderWidth/2, self._diameter-self._borderWidth, self._diameter-self._borderWidth)
+        if (levelOfDetail < KSStyleingData.SCALAR_LOD_SIMPLIFIED):
+            return
 
-        painter.setPen(self._textPen)
-        painter.setFont(self._nodeTextFont)
+        painter.setPen(self._resources.textPen)
+        painter.setFont(self._resources.parameterTextFont)
         textRect = QtCore.QRectF(QtCore.QPoint(34, 0), QtCore.QSizeF(150, 32))
         #painter.fillRect(textRect, QtGui.QColor(0, 0, 255, 255))
         painter.drawText(textRect, QtCore.Qt.AlignVCenter, "Joint Name")
 
 class KSNodeOutput(QtWidgets.QGraphicsItem):
-    _dataProvider: "KSNodeItem" = None
-    _datatype: type = None
-    _dataCache: typing.Any = None
-    _connections: typing.List[KSNodeInput] = []
+    _port: KSNodeOutputPort = None
+    # Inputs connected to this output, an output can feed any number of inputs.
+    _connections: typing.List[KSNodeInput] = None
     
-    _brush: QtGui.QBrush = None
-    _pen: QtGui.QPen = None
+    _style: type = KSStyleingData
+    _resources: KSStyleResources = None
 
     _borderWidth: int = None
     _diameter: int = None
 
-    def __init__(self, parent: "KSNodeItem", datatype: type) -> None:
+    def __init__(self, parent: "KSNodeItem", port: KSNodeOutputPort) -> None:
         super().__init__(parent=parent)
-
-        self._dataProvider = parent
-        self._datatype = datatype
+        self._port = port
+        self._connections = []
+        self._resources = KSStyleResources.forStyle(self._style)
 
         self._borderWidth = KSStyleingData.SCALAR_NODE_BORDER_SIZE
         self._diameter = KSStyleingData.SCALAR_NODE_PARAMETER_DIAMETER
 
-        self._brush = QtGui.QBrush()
-        self._brush.setStyle(QtCore.Qt.SolidPattern)
-        self._brush.setColor(KSStyleingData.COLOR_DATATYPE_STRING.toQColor())
-
-        self._pen = QtGui.QPen()
-        self._pen.setStyle(QtCore.Qt.SolidLine)
-        self._pen.setWidth(self._borderWidth)
-        self._pen.setColor(KSStyleingData.COLOR_NODE_BORDER.toQColor())
+    def port(self) -> KSNodeOutputPort:
+        return self._port
 
-    def setData(self, data: typing.Any) -> None:
-        self._dataCache = data
+    def connections(self) -> typing.List[KSNodeInput]:
+        return self._connections
 
     def onConnect(self, connection: KSNodeInput) -> None:
         self._connections.append(connection)
@@ -306,38 +608,35 @@ class KSNodeOutput(QtWidgets.QGraphicsItem):
             connection.updatePath()
 
     def dataProvider(self) -> "KSNodeItem":
-        return self._dataProvider
+        return self.parentItem()
 
     def data(self) -> typing.Any:
-        # self._dataProvider.executeImplicit()
-        return self._dataCache
+        return self._port.data()
 
     def boundingRect(self) -> QtCore.QRectF:
         return QtCore.QRectF(0, 0, self._diameter, self._diameter)
 
     def paint(self, painter: QtGui.QPainter, option: QtWidgets.QStyleOptionGraphicsItem, widget: typing.Optional[QtWidgets.QWidget] = ...) -> None:
         #painter.fillRect(self.boundingRect(), QtGui.QColor(0, 0, 255, 255))
-        painter.setBrush(self._brush)
-        painter.setPen(self._pen)
+        if (itemLevelOfDetail(painter, option) < KSStyleingData.SCALAR_LOD_MINIMAL):
+            return
+
+        painter.setBrush(self._resources.parameterBrush)
+        painter.setPen(self._resources.parameterPen)
         painter.drawEllipse(self._borderWidth/2, self._borderWidth/2, self._diameter-self._borderWidth, self._diameter-self._borderWidth)
 
 class KSNodeItem(QtWidgets.QGraphicsItem):
-    _title: str = "Node Title"
-    
-    _inputDefinitions: typing.Dict[str, type] = {}
-    _outputDefinitions: typing.Dict[str, type] = {}
+    _node: KSNode = None
 
     _inputs: typing.Dict[str, KSNodeInput] = {}
     _outputs: typing.Dict[str, KSNodeOutput] = {}
 
-    _outputDefinitions: typing.Dict[str, type]
-
+    # Created on the first right click, see contextMenu().
     _contextMenu: QtWidgets.QMenu = None
 
-    _brush: QtGui.QBrush = None
-    _pen: QtGui.QPen = None
+    _style: type = KSStyleingData
+    _resources: KSStyleResources = None
 
-    _separatorPen: QtGui.QPen = None
     _separatorWidth: int = None 
 
     _parameterSpaceing: int = None
@@ -349,17 +648,15 @@ class KSNodeItem(QtWidgets.QGraphicsItem):
     _headerSize: QtCore.QRectF = None
     _bodySize: QtCore.QSizeF = None
 
-    _uniqueIdentifier: str = None
-
-    _tmpDisableAutoOutputs: bool = False
-
-    def __init__(self) -> None:
+    def __init__(self, node: KSNode) -> None:
         super().__init__()
+        self._node = node
         self.setZValue(1)
 
         self.setAcceptHoverEvents(True)
         self.setFlag(QtWidgets.QGraphicsItem.ItemIsMovable)
         self.setFlag(QtWidgets.QGraphicsItem.ItemIsSelectable)
+        self.setFlag(QtWidgets.QGraphicsItem.ItemSendsGeometryChanges)
 
         self._borderWidth = KSStyleingData.SCALAR_NODE_BORDER_SIZE
         self._borderRadius = KSStyleingData.SCALAR_NODE_BORDER_RADIUS
@@ -370,57 +667,32 @@ class KSNodeItem(QtWidgets.QGraphicsItem):
 
         self._parameterSpaceing = KSStyleingData.SCALAR_NODE_PARAMETER_SPACEING
 
-        self._contextMenu = QtWidgets.QMenu()
-        self._contextMenu.setMinimumWidth(400)
-        self._contextMenu.setStyleSheet(STYLE_QMENU)
-        self._contextMenu.addAction("Remove", self.remove)
-        self._contextMenu.addAction("Reload", self.reload)
-
-        self._brush = QtGui.QBrush()
-        self._brush.setStyle(QtCore.Qt.SolidPattern)
-        self._brush.setColor(KSStyleingData.COLOR_NODE_BACKGROUND.toQColor())
-
-        self._pen = QtGui.QPen()
-        self._pen.setStyle(QtCore.Qt.SolidLine)
-        self._pen.setWidth(self._borderWidth)
-        self._pen.setColor(KSStyleingData.COLOR_NODE_BORDER.toQColor())
-
-        self._penSel = QtGui.QPen()
-        self._penSel.setStyle(QtCore.Qt.SolidLine)
-        self._penSel.setWidth(self._borderWidth)
-        self._penSel.setColor(KSStyleingData.COLOR_NODE_BORDER_SELECTED.toQColor())
-
+        self._resources = KSStyleResources.forStyle(self._style)
         self._separatorWidth = KSStyleingData.SCALAR_NODE_BORDER_SIZE / 2
 
-        self._separatorPen = QtGui.QPen()
-        self._separatorPen.setStyle(QtCore.Qt.SolidLine)
-        self._separatorPen.setWidth(self._separatorWidth)
-        self._separatorPen.setColor(KSStyleingData.COLOR_NODE_BORDER.toQColor())
-
-        self._textPen = QtGui.QPen()
-        self._textPen.setStyle(QtCore.Qt.SolidLine)
-        self._textPen.setColor(KSStyleingData.COLOR_NODE_TEXT.toQColor())
+        self.createInputs()
+        self.createOutputs()
 
-        self._nodeTextFont = QtGui.QFont("Hack", 24, QtGui.QFont.Normal)
+        self.setPos(self._node.position()[0], self._node.position()[1])
 
-        self._contextMenu.addAction("Execute", self.executeImplicit)
+    def node(self) -> KSNode:
+        return self._node
 
-        self.createInputs()
-        if not self._tmpDisableAutoOutputs:
-            self.createOutputs()
+    def ports(self) -> typing.List[typing.Union[KSNodeInput, KSNodeOutput]]:
+        return list(self._inputs.values()) + list(self._outputs.values())
 
     def createInputs(self) -> None:
         self._inputs = {}
 
-        for inputDefinitionKey in self._inputDefinitions:
-            newInput = KSNodeInput(self, self._inputDefinitions[inputDefinitionKey])
+        for inputKey in self._node.inputs():
+            newInput = KSNodeInput(self, self._node.inputs()[inputKey])
 
             position = QtCore.QPointF()
             position.setX(-newInput.boundingRect().width() / 2 + self._borderWidth / 2)
             position.setY(sum([self._inputs[key].boundingRect().height() + self._parameterSpaceing for key in self._inputs]) + self._borderWidth / 2 + self._bodyMarginBottom + self.bodyBoundingRect().y())
             newInput.setPos(position)
                 
-            self._inputs[inputDefinitionKey] = newInput 
+            self._inputs[inputKey] = newInput 
 
             self.recalculateBodySize()
 
@@ -428,100 +700,34 @@ class KSNodeItem(QtWidgets.QGraphicsItem):
 
         self._outputs = {}
 
-        for outputDefinitionKey in self._outputDefinitions:
-            newOutput = KSNodeOutput(self, self._outputDefinitions[outputDefinitionKey])
+        for outputKey in self._node.outputs():
+            newOutput = KSNodeOutput(self, self._node.outputs()[outputKey])
 
             position = QtCore.QPointF()
             position.setX(self.bodyBoundingRect().width() - (newOutput.boundingRect().width() / 2 + self._borderWidth / 2))
             position.setY(sum([self._outputs[key].boundingRect().height() + self._parameterSpaceing for key in self._outputs]) + self._borderWidth / 2 + self._bodyMarginBottom + self.bodyBoundingRect().y())
             newOutput.setPos(position)
 
-            self._outputs[outputDefinitionKey] = newOutput 
+            self._outputs[outputKey] = newOutput 
 
             self.recalculateBodySize()
 
-    def getInputData(self, inputKey: str) -> typing.Any:
-        return self._inputs[inputKey].data()
-
-    def setOutputData(self, outputKey: str, data: typing.Any) -> None:
-        self._outputs[outputKey].setData(data)
-
-    def executeImplicit(self) -> None:
-        executeAnnotations: dict = self.execute.__annotations__
-        if ('return' not in executeAnnotations):
-            print("ERROR: The 'execute' function always need to provide a return type! If the desired return type is void/None, use the 'None' type.")
-            return
-
-        executeArgs = []
-        for annotationKey in executeAnnotations:
-            if (annotationKey == 'return'):
-                continue
-            elif (annotationKey in self._inputs):
-                executeArgs.append(self._inputs[annotationKey].data())
-            else:
-                print(f"ERROR: Failed to provide 'execute()' argument with identifier: {annotationKey}")
-
-        if (executeAnnotations['return'] == None):
-            self.execute(*executeArgs)
-        else:
-            executeReturnData = self.execute(*executeArgs)
-            if (type(executeReturnData) != executeAnnotations['return']):
-                print("ERROR: The data returned by execute() did not match with the specified return type!")
-                return
-            self._outputs['return'].setData(executeReturnData)
-
     def execute(self) -> None:
-        pass
-
-    # region Serialization
-    def serialize(self) -> object:
-        data = {
-            'typeIdentifier': self.typeIdentifier(),
-            'UUID': self.uniqueIdentifier(),
-            'position': [self.scenePos().x(), self.scenePos().y()],
-            'inputs': { i:self._inputs[i].serialize() for i in self._inputs }
-        }
-
-        return data
+        # Explicitly requested, so re-run this node even if its cached outputs are up to date.
+        self._node.markDirty()
+        nodeGraph = self.scene().nodeGraph()
+        # Refreshes the profiling overlay, the cached node pixmaps wouldn't pick up the new timings otherwise.
+        nodeGraph.onGraphExecuted(nodeGraph.executor().executeNode(self._node))
 
-    @staticmethod
-    def deserialize(nodeGraph: "KSNodeGraph", data: object) -> KSNodeInput:
-        # print(f" - {data}")
-
-        nodeType = nodeGraph.getNodeTypeFromIdentifier(data['typeIdentifier'])
-        if (nodeType != None and isinstance(nodeType, KSNodeItem)):
-            print("ERROR: Failed to deserialize node.")
-            return
-        
-        node = nodeType()
-        node._uniqueIdentifier = data['UUID']
-        node.setPos(data['position'][0], data['position'][1])
-
-        return node
-
-    def deserializeInputs(self, nodeGraph: "KSNodeGraph", data: object) -> None:
-        for inputKey in data['inputs']:
-            if (inputKey in self._inputs):
-                inputData = data['inputs'][inputKey]
-                self._inputs[inputKey].deserialize(nodeGraph, inputData)
-
-    @classmethod
-    def typeIdentifier(cls) -> str:
-        return cls.__name__
-    
     def uniqueIdentifier(self) -> str:
-        if (self._uniqueIdentifier == None):
-            self._uniqueIdentifier =  ("NODE_" + str(uuid.uuid4().int))
-
-        return self._uniqueIdentifier
-    # endregion
+        return self._node.uniqueIdentifier()
 
     @property
     def pen(self):
         if self.isSelected():
-            return self._penSel
+            return self._resources.nodeSelectedPen
         else:
-            return self._pen
+            return self._resources.nodePen
 
     def recalculateBodySize(self):
         newWidth = self._bodySize.width()
@@ -531,7 +737,10 @@ class KSNodeItem(QtWidgets.QGraphicsItem):
         outputHeight = sum([self._outputs[key].boundingRect().height() + self._parameterSpaceing for key in self._outputs]) - self._parameterSpaceing 
         newHeight += max(inputHeight, outputHeight)
 
-        self._bodySize = QtCore.QSizeF(newWidth, newHeight)
+        if (self._bodySize != QtCore.QSizeF(newWidth, newHeight)):
+            # Also invalidates the cached pixmap, see KSNodeGraph.setNodeCacheEnabled().
+            self.prepareGeometryChange()
+            self._bodySize = QtCore.QSizeF(newWidth, newHeight)
 
     def headerBoundingRect(self) -> QtCore.QRectF:
         margin = (self._headerSize.width() - self._bodySize.width()) * 0.5
@@ -549,45 +758,153 @@ class KSNodeItem(QtWidgets.QGraphicsItem):
         painter.fillRect(self.bodyBoundingRect(), QtCore.Qt.green)
         painter.fillRect(self.headerBoundingRect(), QtCore.Qt.blue)"""
 
+        levelOfDetail = itemLevelOfDetail(painter, option)
+        if (levelOfDetail < KSStyleingData.SCALAR_LOD_SIMPLIFIED):
+            self.paintSimplified(painter, levelOfDetail)
+            return
+
         # Node base.
-        painter.setBrush(self._brush)
+        painter.setBrush(self._resources.nodeBrush)
         painter.setPen(self.pen)
         margin = QtCore.QMarginsF(self._borderWidth / 2, self._borderWidth / 2, self._borderWidth / 2, self._borderWidth / 2)
         painter.drawRoundedRect(self.bodyBoundingRect().marginsRemoved(margin), self._borderRadius, self._borderRadius)
 
-        painter.setPen(self._separatorPen)
+        painter.setPen(self._resources.separatorPen)
         painter.drawLine(self._borderWidth + self._separatorWidth/2, self.bodyBoundingRect().top()+26, self.bodyBoundingRect().width()-(self._borderWidth + self._separatorWidth/2), self.bodyBoundingRect().top()+26)
         painter.drawLine(self._borderWidth + self._separatorWidth/2, self.bodyBoundingRect().bottom()-26, self.bodyBoundingRect().width()-(self._borderWidth + self._separatorWidth/2), self.bodyBoundingRect().bottom()-26)
         painter.drawLine(275, self.bodyBoundingRect().top() + 26 + self._separatorWidth, 275, self.bodyBoundingRect().bottom() - (26 + self._separatorWidth))
 
         # Node label.
-        painter.setPen(self._textPen)
-        painter.setFont(self._nodeTextFont)
+        painter.setPen(self._resources.textPen)
+        painter.setFont(self._resources.nodeTextFont)
         """metrics = QtGui.QFontMetrics(painter.font())
         text_width = metrics.boundingRect(self._title).width() + 14
         text_height = metrics.boundingRect(self._title).height() + 14
         self._headerSize = QtCore.QSizeF(text_width, text_height)"""
-        painter.drawText(self.headerBoundingRect(), QtCore.Qt.AlignCenter, self._title)
+        painter.drawText(self.headerBoundingRect(), QtCore.Qt.AlignCenter, self._node.title())
+
+        nodeGraph = self.scene().nodeGraph()
+        if (nodeGraph.isProfilingOverlayVisible()):
+            self.paintProfilingOverlay(painter, nodeGraph.profiler())
+
+    def paintSimplified(self, painter: QtGui.QPainter, levelOfDetail: float) -> None:
+        # Zoomed out too far to read anything; a flat body, and the title until the minimal level of detail.
+        painter.setRenderHint(QtGui.QPainter.Antialiasing, False)
+        painter.fillRect(self.bodyBoundingRect(), self.pen.color() if self.isSelected() else self._resources.nodeBrush.color())
+
+        if (levelOfDetail >= KSStyleingData.SCALAR_LOD_MINIMAL):
+            painter.setPen(self._resources.textPen)
+            painter.setFont(self._resources.nodeTextFont)
+            painter.drawText(self.headerBoundingRect(), QtCore.Qt.AlignCenter, self._node.title())
+
+    def paintProfilingOverlay(self, painter: QtGui.QPainter, profiler: KSGraphProfiler) -> None:
+        profile = profiler.profile(self._node.uniqueIdentifier())
+        if (profile == None):
+            return
+
+        # Heat map colour, relative to the slowest node of the graph.
+        maxWallTime = profiler.maxWallTime()
+        heat = profile.wallTime() / maxWallTime if maxWallTime > 0 else 0.0
+        cold, hot = KSStyleingData.COLOR_PROFILER_COLD, KSStyleingData.COLOR_PROFILER_HOT
+        heatColor = QtGui.QColor(
+            int(cold.r + (hot.r - cold.r) * heat),
+            int(cold.g + (hot.g - cold.g) * heat),
+            int(cold.b + (hot.b - cold.b) * heat),
+            int(cold.a + (hot.a - cold.a) * heat))
+
+        bodyRect = self.bodyBoundingRect()
+        overlayRect = QtCore.QRectF(bodyRect.left() + self._borderWidth, bodyRect.bottom() - 26, bodyRect.width() - self._borderWidth * 2, 26 - self._borderWidth)
+        painter.setPen(QtCore.Qt.NoPen)
+        painter.setBrush(heatColor)
+        painter.drawRect(overlayRect)
+
+        painter.setPen(self._resources.textPen)
+        painter.setFont(self._resources.profilerTextFont)
+        painter.drawText(overlayRect, QtCore.Qt.AlignCenter, f"{profile.wallTime() * 1000:.2f} ms wall, {profile.cpuTime() * 1000:.2f} ms cpu, {profile.callCount()}x")
 
     def remove(self):
-        scene = self.scene()
-        scene.removeItem(self)
+        self.scene().nodeGraph().removeNode(self)
 
     def reload(self):
-        print("Reload", self.__class__.__name__)
-        importlib.reload(sys.modules[self.__class__.__name__])
+        print("Reload", self._node.__class__.__name__)
+        importlib.reload(sys.modules[self._node.__class__.__module__])
+
+    def setStyle(self, style: type) -> None:
+        self._style = style
+        self._resources = KSStyleResources.forStyle(style)
+        self.update()
+
+    def contextMenu(self) -> QtWidgets.QMenu:
+        if (self._contextMenu == None):
+            self._contextMenu = QtWidgets.QMenu()
+            self._contextMenu.setMinimumWidth(400)
+            self._contextMenu.setStyleSheet(STYLE_QMENU)
+            self._contextMenu.addAction("Remove", self.remove)
+            self._contextMenu.addAction("Reload", self.reload)
+            self._contextMenu.addAction("Execute", self.execute)
+        return self._contextMenu
 
     def contextMenuEvent(self, event: QtWidgets.QGraphicsSceneContextMenuEvent) -> None:
-        self._contextMenu.exec_(event.screenPos())
+        self.contextMenu().exec_(event.screenPos())
+
+    def itemChange(self, change: QtWidgets.QGraphicsItem.GraphicsItemChange, value: typing.Any) -> typing.Any:
+        if (change == QtWidgets.QGraphicsItem.ItemPositionHasChanged):
+            self._node.setPosition(value.x(), value.y())
+            if (self.scene() != None):
+                self.scene().nodeGraph().nodeIndex().insert(self._node, value.x(), value.y())
+                # Every moved node, not only the one under the mouse when dragging a selection.
+                self.scene().nodeGraph().schedulePathUpdate(self)
+
+        return super().itemChange(change, value)
 
-    def mouseMoveEvent(self, event: QtWidgets.QGraphicsSceneMouseEvent) -> None:
-        # FIXME: The path updateing logic should be happening on drag move event, but i don't want to spend time debugging why that ain't working right now..-
+    def updatePaths(self) -> None:
+        """ Updates the connection paths attached to this node's ports, and no others. """
         for inputKey in self._inputs:
             self._inputs[inputKey].updatePath()
         for outputKey in self._outputs:
             self._outputs[outputKey].updatePaths()
 
-        super().mouseMoveEvent(event)
+class KSAsyncioDriver(QtCore.QObject):
+    """ Steps an asyncio event loop from a Qt timer, so coroutines make progress while the Qt event loop keeps running. """
+    _loop: asyncio.AbstractEventLoop = None
+    _timer: QtCore.QTimer = None
+    _tasks: typing.Set[asyncio.Task] = None
+
+    def __init__(self, parent: QtCore.QObject, interval: int = 5) -> None:
+        super().__init__(parent)
+        self._loop = asyncio.new_event_loop()
+        self._tasks = set()
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.step)
+
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def isBusy(self) -> bool:
+        return len(self._tasks) > 0
+
+    def submit(self, coroutine: typing.Coroutine, callback: typing.Callable[[typing.Any], None] = None) -> asyncio.Task:
+        task = self._loop.create_task(coroutine)
+        self._tasks.add(task)
+
+        def onDone(task: asyncio.Task) -> None:
+            self._tasks.discard(task)
+            if (callback != None and not task.cancelled()):
+                callback(task.result())
+
+        task.add_done_callback(onDone)
+        self._timer.start()
+        return task
+
+    def step(self) -> None:
+        # Run everything that is ready right now, then hand control back to Qt.
+        self._loop.call_soon(self._loop.stop)
+        self._loop.run_forever()
+
+        if (not self.isBusy()):
+            self._timer.stop()
 
 class KSViewportState(Enum):
     NONE = 1
@@ -611,15 +928,62 @@ class KSNodeGraph(QtWidgets.QGraphicsView):
     _connectionPath: KSNodeConnectionPath = None
     _connectionOriginItem: typing.Union[KSNodeInput, KSNodeOutput] = None
 
-    _nodeTypes: typing.Dict[str, type] = {}
+    _graph: KSGraph = None
+    _executor: KSGraphExecutor = None
+    _asyncioDriver: KSAsyncioDriver = None
+    _profiler: KSGraphProfiler = None
+    _profilingOverlayVisible: bool = False
+
+    # Positions of every node in the graph, materialized or not.
+    _nodeIndex: KSSpatialHash = None
+    _lazyMaterialization: bool = False
+    _materializationTimer: QtCore.QTimer = None
 
     _addNodeMenu: QtWidgets.QMenu = None
 
     _activeFilepath: str = None
+    _journal: KSGraphJournal = None
+    _journaledSaving: bool = False
+
+    _autosaver: KSGraphAutosaver = None
+    _autosaveTimer: QtCore.QTimer = None
+
+    _nodeCacheEnabled: bool = True
+
+    # Node items moved since the last path update.
+    _movedNodeItems: typing.Set[KSNodeItem] = None
+    _pathUpdateTimer: QtCore.QTimer = None
 
     def __init__(self, parent):
         super().__init__(parent)
 
+        self._graph = KSGraph()
+        self._executor = KSGraphExecutor(self._graph)
+        self._asyncioDriver = KSAsyncioDriver(self)
+        self._profiler = KSGraphProfiler()
+
+        self._nodeIndex = KSSpatialHash(NODE_INDEX_CELL_SIZE)
+        self._materializationTimer = QtCore.QTimer(self)
+        self._materializationTimer.setSingleShot(True)
+        self._materializationTimer.timeout.connect(self.updateMaterialization)
+
+        self._movedNodeItems = set()
+        self._pathUpdateTimer = QtCore.QTimer(self)
+        self._pathUpdateTimer.setSingleShot(True)
+        self._pathUpdateTimer.setTimerType(QtCore.Qt.PreciseTimer)
+        self._pathUpdateTimer.timeout.connect(self.updatePaths)
+
+        self._autosaver = KSGraphAutosaver(self._graph, os.path.join(tempfile.gettempdir(), "KhaosSystemsAutosave"), self.autosaveName())
+        self._autosaveTimer = QtCore.QTimer(self)
+        self._autosaveTimer.timeout.connect(self.autosave)
+        self.setAutosaveInterval(60)
+        # A clean shutdown ends the autosave session, after a crash its session file goes stale instead.
+        QtWidgets.QApplication.instance().aboutToQuit.connect(self._autosaver.close)
+
+        # The pixmap cache is shared with the host application, only ever raise its limit here.
+        if (self.nodeCacheBudget() < NODE_CACHE_BUDGET):
+            self.setNodeCacheBudget(NODE_CACHE_BUDGET)
+
         self.frameSelectedAction = QtWidgets.QAction("Frame Selected", self)
         self.frameSelectedAction.setShortcut(QtGui.QKeySequence(QtCore.Qt.Key_F))
         self.frameSelectedAction.triggered.connect(self.frameSelected)
@@ -650,6 +1014,17 @@ class KSNodeGraph(QtWidgets.QGraphicsView):
         self.saveFileAsAction.triggered.connect(self.saveFileAs)
         self.addAction(self.saveFileAsAction)
 
+        self.executeGraphAction = QtWidgets.QAction("Execute Graph", self)
+        self.executeGraphAction.setShortcut(QtGui.QKeySequence(QtCore.Qt.Key_F6))
+        self.executeGraphAction.triggered.connect(self.executeGraph)
+        self.addAction(self.executeGraphAction)
+
+        self.profilingOverlayAction = QtWidgets.QAction("Profiling Overlay", self)
+        self.profilingOverlayAction.setCheckable(True)
+        self.profilingOverlayAction.setShortcut(QtGui.QKeySequence(QtCore.Qt.Key_F7))
+        self.profilingOverlayAction.toggled.connect(self.setProfilingOverlayVisible)
+        self.addAction(self.profilingOverlayAction)
+
         self.openFileAction = QtWidgets.QAction("Open File", self)
         self.openFileAction.setShortcut(QtGui.QKeySequence('Ctrl+O'))
         self.openFileAction.triggered.connect(self.openFile)
@@ -662,6 +1037,8 @@ class KSNodeGraph(QtWidgets.QGraphicsView):
         self._contextMenu.addSeparator()
         self._contextMenu.addAction(self.reloadGraphAction)
         self._contextMenu.addAction(self.frameSelectedAction)
+        self._contextMenu.addAction(self.executeGraphAction)
+        self._contextMenu.addAction(self.profilingOverlayAction)
         self._contextMenu.addSeparator()
         self._contextMenu.addAction(self.newFileAction)
         self._contextMenu.addAction(self.saveFileAction)
@@ -700,52 +1077,99 @@ class KSNodeGraph(QtWidgets.QGraphicsView):
         self.removeAllNodes()
 
     def saveFile(self):
-        if (self._activeFilepath != None):
-            with open(self._activeFilepath, "w") as filepath:
-                filepath.write(self.serializeToJson())
+        if (self._activeFilepath != None and self._journaledSaving and self._journal != None):
+            self._journal.save(self._graph)
+        elif (self._activeFilepath != None):
+            self.writeFile(self._activeFilepath)
         else:
             self.saveFileAs()
 
     def saveFileAs(self):
-        fileInfo = QtWidgets.QFileDialog.getSaveFileName(self, caption="Save As", filter="Json Files (*.json)")
+        fileInfo = QtWidgets.QFileDialog.getSaveFileName(self, caption="Save As", filter=GRAPH_FILE_FILTER)
+        if (fileInfo[0] == ""):
+            return
         self._activeFilepath = fileInfo[0]
-        with open(self._activeFilepath, "w") as file:
-            file.write(self.serializeToJson())
+        self.writeFile(self._activeFilepath)
 
     def openFile(self):
-        filepath = QtWidgets.QFileDialog.getOpenFileName(self, caption="Open File", filter="Json Files (*.json)")
+        filepath = QtWidgets.QFileDialog.getOpenFileName(self, caption="Open File", filter=GRAPH_FILE_FILTER)
+        if (filepath[0] == ""):
+            return
         self.removeAllNodes()
-        with open(filepath[0]) as file:
-            data = file.read().replace('\n', '')
-            self.deserializeFromJson(data)
+        self.readFile(filepath[0])
+        self._activeFilepath = filepath[0]
+
+    def openJournal(self, filepath: str) -> KSGraphJournal:
+        """ Switches to the journal of the file, reusing the current one if it's the same file. """
+        if (self._journal != None):
+            # A compaction still running would otherwise replace the old file (and journal) later on.
+            self._journal.waitForCompaction()
+            if (os.path.abspath(self._journal.filepath()) == os.path.abspath(filepath)):
+                return self._journal
+
+        self._journal = KSGraphJournal(filepath)
+        return self._journal
+
+    def writeFile(self, filepath: str) -> None:
+        """ Saves the complete graph, in the binary format if the file has the binary extension, as JSON otherwise. """
+        self.openJournal(filepath).writeSnapshot(self._graph)
+
+    def readFile(self, filepath: str) -> None:
+        """ Opens a graph file, including the changes journaled since it was last written completely. """
+        nodes = self.openJournal(filepath).load(self._graph)
+        print(f"Deserialized {len(nodes)} items.")
+        self.createNodeViews(nodes)
+
+    def isJournaledSaving(self) -> bool:
+        return self._journaledSaving
+
+    def setJournaledSaving(self, enabled: bool) -> None:
+        """ While enabled, Save only appends the changes since the previous save to the file's journal, see KSGraphJournal. """
+        self._journaledSaving = enabled
+
+    def autosaver(self) -> KSGraphAutosaver:
+        return self._autosaver
+
+    def autosaveInterval(self) -> int:
+        return self._autosaveTimer.interval() // 1000 if self._autosaveTimer.isActive() else 0
+
+    def setAutosaveInterval(self, seconds: int) -> None:
+        """ Autosaves every given number of seconds, 0 disables autosaving. """
+        if (seconds > 0):
+            self._autosaveTimer.start(seconds * 1000)
+            # Other sessions must not take this one for crashed between two autosaves.
+            self._autosaver.setSessionTimeout(max(10 * 60, seconds * 3))
+        else:
+            self._autosaveTimer.stop()
+
+    def setAutosaveRetentionCount(self, retentionCount: int) -> None:
+        self._autosaver.setRetentionCount(retentionCount)
+
+    def autosaveName(self) -> str:
+        return os.path.basename(self._activeFilepath) if self._activeFilepath != None else "untitled"
+
+    def autosave(self) -> None:
+        self._autosaver.setName(self.autosaveName())
+        self._autosaver.autosave()
+
+    def recoverableAutosaves(self) -> typing.List[str]:
+        """ Returns the autosaves of the active file left by sessions that crashed or closed, newest first. """
+        return self._autosaver.recoverableAutosaves(self.autosaveName())
+
+    def restoreAutosave(self, filepath: str) -> None:
+        """ Replaces the graph with an autosave, the active file is kept so the next save overwrites it. """
+        self.removeAllNodes()
+        nodes = KSGraphAutosaver.load(self._graph, filepath)
+        print(f"Deserialized {len(nodes)} items.")
+        self.createNodeViews(nodes)
 
     def serializeToJson(self) -> str:
-        # Items
-        items = []
-        for item in self.scene().items():
-            if (isinstance(item, KSNodeItem)):
-                items.append(item.serialize())
-                
-        data = { 'items': items }
-        return json.dumps(data)
+        return self._graph.serializeToJson()
 
     def deserializeFromJson(self, jsonStr: str) -> None:
-        data = json.loads(jsonStr)
-
-        # Deserialize items
-        if (data['items'] != None):
-            print(f"Deserializing {len(data['items'])} items:")
-                
-            # Add items
-            deserializedNodes = []
-            for itemData in data['items']:
-                node = KSNodeItem.deserialize(self, itemData)
-                deserializedNodes.append([node, itemData])
-                self.addNode(node)
-
-            # Add connections
-            for nodeData in deserializedNodes:
-                nodeData[0].deserializeInputs(self, nodeData[1])
+        nodes = self._graph.deserializeFromJson(jsonStr)
+        print(f"Deserialized {len(nodes)} items.")
+        self.createNodeViews(nodes)
     # endregion
 
     # region Rubberband
@@ -781,11 +1205,18 @@ class KSNodeGraph(QtWidgets.QGraphicsView):
         self.scene().addItem(self._connectionPath)
         self.setInteractive(False)
 
+    def isConnectable(self, port: typing.Union[KSNodeInput, KSNodeOutput]) -> bool:
+        """ Whether the connection being created can end at the port. """
+        return (self._connectionOriginItem != None and type(port) != type(self._connectionOriginItem) and port.parentItem() != self._connectionOriginItem.parentItem())
+
     def updateConnection(self, mousePosition: QtCore.QPointF()) -> None:
         if (self._connectionPath == None or self._connectionOriginItem == None):
             return
 
-        self._connectionPath.updatePath(self._connectionOriginItem.scenePos() + self._connectionOriginItem.boundingRect().center(), self.mapToScene(mousePosition))
+        # Snap to the closest port the connection could be dropped on.
+        port = self.portAt(mousePosition, PORT_SNAP_RADIUS, self.isConnectable)
+        targetPoint = port.scenePos() + port.boundingRect().center() if port != None else self.mapToScene(mousePosition)
+        self._connectionPath.updatePath(self._connectionOriginItem.scenePos() + self._connectionOriginItem.boundingRect().center(), targetPoint)
 
     def releaseConnection(self, destinationItem: typing.Any) -> None:
         if (destinationItem != None):
@@ -804,28 +1235,177 @@ class KSNodeGraph(QtWidgets.QGraphicsView):
     def reloadGraph(self) -> None:
         print("Reloading")
 
-    def addNode(self, node: KSNodeItem) -> None:
-        if (node.__class__.__name__ not in self._nodeTypes):
-            print(f"ERROR: Failed to find node type with identifier: {node.__class__.__name__} in the node dictionary.")
+    def graph(self) -> KSGraph:
+        return self._graph
+
+    def executor(self) -> KSGraphExecutor:
+        return self._executor
+
+    def asyncioDriver(self) -> KSAsyncioDriver:
+        return self._asyncioDriver
+
+    def executeGraph(self) -> None:
+        """ Executes the graph without blocking the view while async nodes are awaiting. """
+        if (self._asyncioDriver.isBusy()):
+            print("ERROR: The graph is already being executed.")
+            return
+
+        self._asyncioDriver.submit(self._executor.executeAsync(), self.onGraphExecuted)
+
+    def onGraphExecuted(self, success: bool) -> None:
+        print(f"Graph execution {'finished' if success else 'failed'}.")
+        if (self._profilingOverlayVisible):
+            self.updateNodeItems()
+
+    def profiler(self) -> KSGraphProfiler:
+        return self._profiler
+
+    def isProfilingOverlayVisible(self) -> bool:
+        return self._profilingOverlayVisible
+
+    def setProfilingOverlayVisible(self, visible: bool) -> None:
+        """ Profiles node execution while visible, and draws the timings as a heat map on top of the nodes. """
+        self._profilingOverlayVisible = visible
+        self._executor.setProfiler(self._profiler if visible else None)
+        if (self.profilingOverlayAction.isChecked() != visible):
+            self.profilingOverlayAction.setChecked(visible)
+        self.updateNodeItems()
+
+    def updateNodeItems(self) -> None:
+        """ Repaints every node item, scene().update() alone would reuse their cached pixmaps. """
+        for nodeItem in self.scene().nodeItems():
+            nodeItem.update()
+
+    def isNodeCacheEnabled(self) -> bool:
+        return self._nodeCacheEnabled
+
+    def setNodeCacheEnabled(self, enabled: bool) -> None:
+        """
+        While enabled, node items are rendered into a device coordinate pixmap cache and only repainted when they
+        change (title, selection, size, style or an explicit update()); moving them, or anything else, reuses the pixmap.
+        """
+        self._nodeCacheEnabled = enabled
+        for nodeItem in self.scene().nodeItems():
+            nodeItem.setCacheMode(self.nodeCacheMode())
+
+    def nodeCacheMode(self) -> QtWidgets.QGraphicsItem.CacheMode:
+        return QtWidgets.QGraphicsItem.DeviceCoordinateCache if self._nodeCacheEnabled else QtWidgets.QGraphicsItem.NoCache
+
+    def nodeCacheBudget(self) -> int:
+        return QtGui.QPixmapCache.cacheLimit() * 1024
+
+    def setNodeCacheBudget(self, budget: int) -> None:
+        """ Memory budget in bytes of the pixmap cache (shared with the rest of the application), see QPixmapCache. """
+        QtGui.QPixmapCache.setCacheLimit(budget // 1024)
+
+    def schedulePathUpdate(self, nodeItem: KSNodeItem) -> None:
+        """ Marks the node item as moved, its connection paths are updated on the next frame. """
+        self._movedNodeItems.add(nodeItem)
+        # Not restarted by later moves, so a continuous drag still updates every frame.
+        if (not self._pathUpdateTimer.isActive()):
+            self._pathUpdateTimer.start(PATH_UPDATE_INTERVAL)
+
+    def updatePaths(self) -> None:
+        """ Updates the connection paths and indexed port positions of the node items moved since the last update. """
+        self._pathUpdateTimer.stop()
+        movedNodeItems = self._movedNodeItems
+        self._movedNodeItems = set()
+        for nodeItem in movedNodeItems:
+            # Released while waiting, see releaseNodeItem().
+            if (nodeItem.scene() == self.scene()):
+                nodeItem.updatePaths()
+                self.scene().indexPorts(nodeItem)
+
+    def portAt(self, position: QtCore.QPoint, snapRadius: float = 0, accept: typing.Callable[[typing.Union[KSNodeInput, KSNodeOutput]], bool] = None) -> typing.Union[KSNodeInput, KSNodeOutput]:
+        """ Returns the port at the view position, or the closest one within snapRadius view pixels of its edge. """
+        if (len(self._movedNodeItems) > 0):
+            self.updatePaths()
+
+        radius = KSStyleingData.SCALAR_NODE_PARAMETER_DIAMETER / 2 + snapRadius / self.transform().m11()
+        return self.scene().portAt(self.mapToScene(position), radius, accept)
+
+    def createNodeItem(self, node: KSNode) -> KSNodeItem:
+        nodeItem = KSNodeItem(node)
+        nodeItem.setCacheMode(self.nodeCacheMode())
+        return nodeItem
+
+    def addNode(self, node: KSNode) -> KSNodeItem:
+        if (not self._graph.addNode(node)):
+            return None
+
+        self._nodeIndex.insert(node, node.position()[0], node.position()[1])
+        nodeItem = self.createNodeItem(node)
+        self.scene().addItem(nodeItem)
+        return nodeItem
+
+    def createNodeItems(self, nodes: typing.List[KSNode]) -> typing.List[KSNodeItem]:
+        """ Creates view items (and connection paths) for nodes that already exist in the graph model. """
+        nodeItems = [self.createNodeItem(node) for node in nodes]
+
+        with self.scene().batchInsert():
+            self.scene().addItems(nodeItems)
+
+            for nodeItem in nodeItems:
+                for inputKey, inputPort in nodeItem.node().inputs().items():
+                    outputPort = inputPort.connection()
+                    if (outputPort == None):
+                        continue
+                    outputNodeItem = self.scene().nodeItem(outputPort.node().uniqueIdentifier())
+                    if (outputNodeItem != None):
+                        nodeItem._inputs[inputKey].bindConnection(outputNodeItem._outputs[outputPort.key()])
+
+            # Consumers that already had an item before this call.
+            for nodeItem in nodeItems:
+                for outputKey, outputPort in nodeItem.node().outputs().items():
+                    for inputPort in outputPort.connections():
+                        inputNodeItem = self.scene().nodeItem(inputPort.node().uniqueIdentifier())
+                        if (inputNodeItem != None and inputNodeItem._inputs[inputPort.key()]._connection == None):
+                            inputNodeItem._inputs[inputPort.key()].bindConnection(nodeItem._outputs[outputKey])
+
+        return nodeItems
+
+    def createNodeViews(self, nodes: typing.List[KSNode]) -> None:
+        """ Creates the view side of nodes that already exist in the graph model; only index records while lazy materialization is enabled. """
+        for node in nodes:
+            self._nodeIndex.insert(node, node.position()[0], node.position()[1])
+
+        if (self._lazyMaterialization):
+            bounds = self._nodeIndex.bounds()
+            if (bounds != None):
+                self.scene().includeBounds(QtCore.QRectF(bounds[0], bounds[1], bounds[2] - bounds[0] + NODE_EXTENT, bounds[3] - bounds[1] + NODE_EXTENT))
+            self.updateMaterialization()
+        else:
+            self.createNodeItems(nodes)
+
+    def releaseNodeItem(self, nodeItem: KSNodeItem) -> None:
+        """ Removes the node's item (and connection paths) from the scene, the node itself stays in the graph. """
+        for inputKey in nodeItem._inputs:
+            nodeItem._inputs[inputKey].unbindConnection()
+        for outputKey in nodeItem._outputs:
+            for connection in list(nodeItem._outputs[outputKey].connections()):
+                connection.unbindConnection()
+
+        self.scene().removeItem(nodeItem)
+
+    def removeNode(self, nodeItem: KSNodeItem) -> None:
+        if (self.scene().nodeItem(nodeItem.uniqueIdentifier()) != nodeItem):
             return
-        self.scene().nodes['name'] = node
-        self.scene().addItem(node)
 
-    def removeNode(self, node: KSNodeInput) -> None:
-        if (node in self.scene().items()):
-           self.scene().removeItem(node)
+        self.releaseNodeItem(nodeItem)
+        self._nodeIndex.remove(nodeItem.node())
+        self._graph.removeNode(nodeItem.node())
 
     def removeAllNodes(self) -> None:
-        for item in self.scene().items():
-            if (isinstance(item, KSNodeItem)):
-                self.removeNode(item)
+        for nodeItem in self.scene().nodeItems():
+            self.removeNode(nodeItem)
+
+        # Nodes that were never materialized.
+        self._graph.removeAllNodes()
+        self._nodeIndex.clear()
 
     def addNodeType(self, nodeType: type) -> None:
-        if (isinstance(nodeType, KSNodeItem) and nodeType.typeIdentifier() in self._nodeTypes):
-            print(f"ERROR: The node dictionary already contains an entry with identifier: {nodeType.typeIdentifier()}.")
+        if (not self._graph.addNodeType(nodeType)):
             return
-        
-        self._nodeTypes[nodeType.typeIdentifier()] = nodeType
 
         addNodeAction = QtWidgets.QAction(str(nodeType._title), self)
         addNodeAction.triggered.connect( lambda checked: self.addNodeFromNodeMenu(nodeType) )
@@ -833,21 +1413,88 @@ class KSNodeGraph(QtWidgets.QGraphicsView):
 
     def addNodeFromNodeMenu(self, nodeType: type) -> None:
         print(nodeType)
+        position = self.mapToScene(self.mapFromGlobal(QtGui.QCursor.pos()))
         node = nodeType()
-        node.setPos(self.mapToScene(self.mapFromGlobal(QtGui.QCursor.pos())))
+        node.setPosition(position.x(), position.y())
         self.addNode(node)
 
     def getNodeTypeFromIdentifier(self, identifier: str) -> type:
-        return self._nodeTypes[identifier]
+        return self._graph.getNodeTypeFromIdentifier(identifier)
+    # endregion
+
+    # region Lazy materialization
+    def nodeIndex(self) -> KSSpatialHash:
+        return self._nodeIndex
+
+    def isLazyMaterialization(self) -> bool:
+        return self._lazyMaterialization
+
+    def setLazyMaterialization(self, enabled: bool) -> None:
+        """
+        While enabled, nodes only get a KSNodeItem once they come close to the visible rect, and lose it again once they
+        are far away; until then they only exist in the graph model and the node index.
+        """
+        self._lazyMaterialization = enabled
+        if (enabled):
+            self.updateMaterialization()
+        else:
+            self.createNodeItems([node for node in self._graph.nodes() if self.scene().nodeItem(node.uniqueIdentifier()) == None])
+
+    def scheduleMaterialization(self) -> None:
+        # Coalesce the many scroll/zoom steps of a single interaction into one update.
+        if (self._lazyMaterialization and not self._materializationTimer.isActive()):
+            self._materializationTimer.start(0)
+
+    def updateMaterialization(self) -> None:
+        if (not self._lazyMaterialization):
+            return
+
+        visibleRect = self.mapToScene(self.viewport().rect()).boundingRect()
+        size = max(visibleRect.width(), visibleRect.height())
+        nearRect = visibleRect.adjusted(-size * 0.25 - NODE_EXTENT, -size * 0.25 - NODE_EXTENT, size * 0.25, size * 0.25)
+        farRect = visibleRect.adjusted(-size - NODE_EXTENT, -size - NODE_EXTENT, size, size)
+
+        nearNodes = self._nodeIndex.query(nearRect.left(), nearRect.top(), nearRect.right(), nearRect.bottom())
+        # Direct neighbours too, so connections leaving the visible rect are still drawn.
+        keepNodes = set(nearNodes)
+        neighbourNodes = set()
+        for node in nearNodes:
+            neighbourNodes.update(node.upstreamNodes())
+            neighbourNodes.update(node.downstreamNodes())
+        neighbourNodes.difference_update(keepNodes)
+        if (len(neighbourNodes) > NODE_NEIGHBOUR_LIMIT):
+            center = visibleRect.center()
+            neighbourNodes = sorted(neighbourNodes, key=lambda node: (node.position()[0] - center.x()) ** 2 + (node.position()[1] - center.y()) ** 2)[:NODE_NEIGHBOUR_LIMIT]
+        keepNodes.update(neighbourNodes)
+
+        for nodeItem in self.scene().nodeItems():
+            if (nodeItem.node() in keepNodes or nodeItem.isSelected()):
+                continue
+            if (not farRect.contains(nodeItem.node().position()[0], nodeItem.node().position()[1])):
+                self.releaseNodeItem(nodeItem)
+
+        self.createNodeItems([node for node in keepNodes if self.scene().nodeItem(node.uniqueIdentifier()) == None])
+
+    def scrollContentsBy(self, dx: int, dy: int) -> None:
+        super().scrollContentsBy(dx, dy)
+        self.scheduleMaterialization()
+
+    def resizeEvent(self, event: QtGui.QResizeEvent) -> None:
+        super().resizeEvent(event)
+        self.scheduleMaterialization()
     # endregion
 
     def frameSelected(self):
         if len(self.scene().selectedItems()) > 0:
             selectionBounds = self.scene().selectionItemsBoundingRect()
+        elif (self._lazyMaterialization and len(self._nodeIndex) > 0):
+            bounds = self._nodeIndex.bounds()
+            selectionBounds = QtCore.QRectF(bounds[0], bounds[1], bounds[2] - bounds[0] + NODE_EXTENT, bounds[3] - bounds[1] + NODE_EXTENT)
         else:
             selectionBounds = self.scene().itemsBoundingRect()
         selectionBounds = selectionBounds.marginsAdded(QtCore.QMarginsF(64, 64+50, 64, 64))
         self.fitInView(selectionBounds, QtCore.Qt.KeepAspectRatio)
+        self.scheduleMaterialization()
 
     def contextMenuEvent(self, event: QtGui.QContextMenuEvent) -> None:
         if (self._viewportState == KSViewportState.NONE and self.scene().itemAt(self.mapToScene(event.pos()), QtGui.QTransform()) is None):
@@ -882,35 +1529,34 @@ class KSNodeGraph(QtWidgets.QGraphicsView):
             self.window().setCursor(QtCore.Qt.SizeVerCursor)
             self._viewportState = KSViewportState.ZOOMING
 
-        # Rubberband selecting
-        elif (event.button() == QtCore.Qt.LeftButton and event.modifiers() == QtCore.Qt.NoModifier and self.scene().itemAt(self.mapToScene(event.pos()), QtGui.QTransform()) is None):
-            self.startRubberband(event.pos())
-        
-        # Create connection or click selecting
-        elif (event.button() == QtCore.Qt.LeftButton and event.modifiers() == QtCore.Qt.NoModifier and self.scene().itemAt(self.mapToScene(event.pos()), QtGui.QTransform()) is not None):
-            item = self.itemAt(event.pos())
+        elif (event.button() == QtCore.Qt.LeftButton and event.modifiers() == QtCore.Qt.NoModifier):
+            scenePosition = self.mapToScene(event.pos())
+            port = self.portAt(event.pos())
 
             # Create connection
-            if (type(item) in (KSNodeInput, KSNodeOutput)):
-                self.startConnection(item)
-            
-            # Select connection path
-            elif (type(item) == KSNodeConnectionPath):
-                pass
-                #TODO: Handle
+            if (port != None):
+                self.startConnection(port)
 
             # Click selecting / moveing
-            else:
+            elif (self.scene().itemAt(scenePosition, QtGui.QTransform()) is not None):
                 self._viewportState = KSViewportState.DRAGGING_ITEM
                 self.setInteractive(True)
                 super().mousePressEvent(event)
+
+            # Select connection
+            elif (self.scene().connectionLayer().edgeAt(scenePosition) != None):
+                pass
+                #TODO: Handle
+
+            # Rubberband selecting
+            else:
+                self.startRubberband(event.pos())
             
     def mouseReleaseEvent(self, event: QtGui.QMouseEvent) -> None:
         super().mouseReleaseEvent(event)
         
         if (self._viewportState == KSViewportState.CREATING_CONNECTION):
-            item = self.itemAt(event.pos())
-            self.releaseConnection(item)
+            self.releaseConnection(self.portAt(event.pos(), PORT_SNAP_RADIUS, self.isConnectable))
 
         elif self._viewportState == KSViewportState.SELECTING:
             self.releaseRubberband()
@@ -978,6 +1624,7 @@ class KSNodeGraph(QtWidgets.QGraphicsView):
             newSceneSpaceOriginPoint = self.mapToScene(self._lastRightMousePressPosition)
             translationDelta = newSceneSpaceOriginPoint - oldSceneSpaceOriginPoint;
             self.translate(translationDelta.x(), translationDelta.y())
+            self.scheduleMaterialization()
        
         # Creating connection
         elif (self._viewportState == KSViewportState.CREATING_CONNECTION):
@@ -995,17 +1642,184 @@ class KSNodeGraph(QtWidgets.QGraphicsView):
         self.setTransformationAnchor(QtWidgets.QGraphicsView.AnchorUnderMouse)
         scaleFactor = (1.05) if (event.angleDelta().y() + event.angleDelta().x() > 0) else (0.95)
         self.scale(scaleFactor, scaleFactor)
+        self.scheduleMaterialization()
     # endregion
     
 class KSNodeScene(QtWidgets.QGraphicsScene):
+    # UUID -> node item index, so lookups never have to walk items() (which includes every port, path and widget).
+    _nodeItems: typing.Dict[str, KSNodeItem] = None
+
+    # Bounds of the added items, grown incrementally instead of recomputing itemsBoundingRect() on every add.
+    _itemsBounds: QtCore.QRectF = None
+    _batchInsertDepth: int = 0
+
+    _connectionLayer: KSConnectionLayer = None
+
+    # Port item -> centre in scene coordinates, see portAt().
+    _portIndex: KSSpatialHash = None
+
+    _gridVisible: bool = True
+    # Tile pixel size -> pixmap of one major grid cell, see gridTile().
+    _gridTiles: typing.Dict[int, QtGui.QPixmap] = None
+
     def __init__(self, parent):
         super().__init__(parent)
         self.setBackgroundBrush(KSStyleingData.COLOR_VIEWPORT_BACKGROUND.toQColor())
-        self.nodes = dict()
+        self._nodeItems = {}
+        self._itemsBounds = QtCore.QRectF()
+        self._portIndex = KSSpatialHash(PORT_INDEX_CELL_SIZE)
+        self._gridTiles = {}
+
+        self._connectionLayer = KSConnectionLayer()
+        self.addItem(self._connectionLayer)
+
+    def nodeGraph(self) -> KSNodeGraph:
+        return self.parent()
+
+    def connectionLayer(self) -> KSConnectionLayer:
+        return self._connectionLayer
 
     def addItem(self, item: QtWidgets.QGraphicsItem) -> None:
         super().addItem(item)
-        self.setSceneRect(self.itemsBoundingRect().marginsAdded(QtCore.QMarginsF(1024*128, 1024*128, 1024*128, 1024*128)))
+        if (isinstance(item, KSNodeItem)):
+            self._nodeItems[item.uniqueIdentifier()] = item
+            self.indexPorts(item)
+
+        self.includeBounds(item.sceneBoundingRect())
+
+    def includeBounds(self, rect: QtCore.QRectF) -> None:
+        """ Grows the scene rect to cover the rect, e.g. for nodes that don't have an item yet. """
+        self._itemsBounds |= rect
+        if (self._batchInsertDepth == 0):
+            self.updateSceneRect()
+
+    def addItems(self, items: typing.List[QtWidgets.QGraphicsItem]) -> None:
+        with self.batchInsert():
+            for item in items:
+                self.addItem(item)
+
+    @contextlib.contextmanager
+    def batchInsert(self) -> typing.Iterator[None]:
+        """ Items added inside this context only update the scene rect once, when the outermost context exits. """
+        self._batchInsertDepth += 1
+        try:
+            yield
+        finally:
+            self._batchInsertDepth -= 1
+            if (self._batchInsertDepth == 0):
+                self.updateSceneRect()
+
+    def updateSceneRect(self) -> None:
+        sceneRect = self._itemsBounds.marginsAdded(QtCore.QMarginsF(1024*128, 1024*128, 1024*128, 1024*128))
+        if (sceneRect != self.sceneRect()):
+            self.setSceneRect(sceneRect)
+
+    def removeItem(self, item: QtWidgets.QGraphicsItem) -> None:
+        if (isinstance(item, KSNodeItem) and self._nodeItems.get(item.uniqueIdentifier(), None) == item):
+            del self._nodeItems[item.uniqueIdentifier()]
+            for port in item.ports():
+                self._portIndex.remove(port)
+        super().removeItem(item)
+
+    def indexPorts(self, nodeItem: KSNodeItem) -> None:
+        for port in nodeItem.ports():
+            center = port.scenePos() + port.boundingRect().center()
+            self._portIndex.insert(port, center.x(), center.y())
+
+    def portIndex(self) -> KSSpatialHash:
+        return self._portIndex
+
+    def portAt(self, position: QtCore.QPointF, radius: float, accept: typing.Callable[[typing.Union[KSNodeInput, KSNodeOutput]], bool] = None) -> typing.Union[KSNodeInput, KSNodeOutput]:
+        """ Returns the port with its centre closest to the scene position within radius, or None. """
+        return self._portIndex.nearest(position.x(), position.y(), radius, accept)
+
+    def nodeItem(self, uniqueIdentifier: str) -> KSNodeItem:
+        return self._nodeItems.get(uniqueIdentifier, None)
+
+    def nodeItems(self) -> typing.List[KSNodeItem]:
+        return list(self._nodeItems.values())
+
+    # region Grid background
+    def isGridVisible(self) -> bool:
+        return self._gridVisible
+
+    def setGridVisible(self, visible: bool) -> None:
+        self._gridVisible = visible
+        self.update()
+
+    @staticmethod
+    def gridFade(spacing: float) -> float:
+        """ Opacity of grid lines spacing pixels apart. """
+        return min(max((spacing - KSStyleingData.SCALAR_GRID_FADE_MIN) / (KSStyleingData.SCALAR_GRID_FADE_MAX - KSStyleingData.SCALAR_GRID_FADE_MIN), 0), 1)
+
+    @staticmethod
+    def gridColor(color: KSColor, fade: float) -> QtGui.QColor:
+        gridColor = color.toQColor()
+        gridColor.setAlphaF(gridColor.alphaF() * fade)
+        return gridColor
+
+    def gridTile(self, tileSize: int) -> QtGui.QPixmap:
+        """ Returns one major grid cell, tileSize pixels wide, with the major lines along its top and left edge. """
+        tile = self._gridTiles.get(tileSize, None)
+        if (tile != None):
+            return tile
+
+        subdivisions = KSStyleingData.SCALAR_GRID_MAJOR_SUBDIVISIONS
+        majorWidth = KSStyleingData.SCALAR_GRID_MAJOR_LINE_WIDTH
+        tile = QtGui.QPixmap(tileSize, tileSize)
+        tile.fill(KSStyleingData.COLOR_VIEWPORT_BACKGROUND.toQColor())
+
+        painter = QtGui.QPainter(tile)
+        minorColor = self.gridColor(KSStyleingData.COLOR_GRID_MINOR, self.gridFade(tileSize / subdivisions))
+        for index in range(1, subdivisions):
+            offset = round(index * tileSize / subdivisions)
+            painter.fillRect(offset, 0, 1, tileSize, minorColor)
+            painter.fillRect(0, offset, tileSize, 1, minorColor)
+        majorColor = self.gridColor(KSStyleingData.COLOR_GRID_MAJOR, self.gridFade(tileSize))
+        painter.fillRect(0, 0, majorWidth, tileSize, majorColor)
+        painter.fillRect(majorWidth, 0, tileSize - majorWidth, majorWidth, majorColor)
+        painter.end()
+
+        if (len(self._gridTiles) >= GRID_TILE_CACHE_SIZE):
+            del self._gridTiles[next(iter(self._gridTiles))]
+        self._gridTiles[tileSize] = tile
+        return tile
+
+    def drawBackground(self, painter: QtGui.QPainter, rect: QtCore.QRectF) -> None:
+        """ Fills the exposed rect with the cached grid tile of the current zoom level, a single textured fill. """
+        scale = painter.worldTransform().m11()
+        majorSize = KSStyleingData.SCALAR_GRID_SIZE * KSStyleingData.SCALAR_GRID_MAJOR_SUBDIVISIONS
+        tileSize = round(majorSize * scale)
+        if (not self._gridVisible or scale <= 0 or self.gridFade(tileSize) == 0):
+            painter.fillRect(rect, KSStyleingData.COLOR_VIEWPORT_BACKGROUND.toQColor())
+            return
+
+        if (tileSize > GRID_TILE_MAX_SIZE):
+            # Zoomed in too far for a reasonably sized tile, but then only a few lines are visible.
+            self.drawGridLines(painter, rect, scale)
+            return
+
+        # Textures tile from the scene origin, so the tile's top left corner lands on major grid lines.
+        brush = QtGui.QBrush(self.gridTile(tileSize))
+        brush.setTransform(QtGui.QTransform.fromScale(majorSize / tileSize, majorSize / tileSize))
+        painter.fillRect(rect, brush)
+
+    def drawGridLines(self, painter: QtGui.QPainter, rect: QtCore.QRectF, scale: float) -> None:
+        painter.fillRect(rect, KSStyleingData.COLOR_VIEWPORT_BACKGROUND.toQColor())
+
+        gridSize = KSStyleingData.SCALAR_GRID_SIZE
+        subdivisions = KSStyleingData.SCALAR_GRID_MAJOR_SUBDIVISIONS
+        minorColor = self.gridColor(KSStyleingData.COLOR_GRID_MINOR, self.gridFade(gridSize * scale))
+        majorColor = self.gridColor(KSStyleingData.COLOR_GRID_MAJOR, 1)
+        for column in range(math.floor(rect.left() / gridSize), math.ceil(rect.right() / gridSize) + 1):
+            major = column % subdivisions == 0
+            width = (KSStyleingData.SCALAR_GRID_MAJOR_LINE_WIDTH if major else 1) / scale
+            painter.fillRect(QtCore.QRectF(column * gridSize, rect.top(), width, rect.height()), majorColor if major else minorColor)
+        for row in range(math.floor(rect.top() / gridSize), math.ceil(rect.bottom() / gridSize) + 1):
+            major = row % subdivisions == 0
+            width = (KSStyleingData.SCALAR_GRID_MAJOR_LINE_WIDTH if major else 1) / scale
+            painter.fillRect(QtCore.QRectF(rect.left(), row * gridSize, rect.width(), width), majorColor if major else minorColor)
+    # endregion
 
     def selectionItemsBoundingRect(self) -> QtCore.QRectF:
         # Does not take untransformable items into account.
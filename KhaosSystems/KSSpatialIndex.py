@@ -0,0 +1,99 @@
+import typing
+import math
+
+class KSSpatialHash(object):
+    """
+    Uniform grid of square cells mapping keys to points, so everything inside a rectangle can be found without
+    visiting every key. Plain floats only; nothing in here depends on Qt.
+    """
+    _cellSize: float = None
+    _cells: typing.Dict[typing.Tuple[int, int], typing.Set[typing.Any]] = None
+    _positions: typing.Dict[typing.Any, typing.Tuple[float, float]] = None
+
+    def __init__(self, cellSize: float) -> None:
+        self._cellSize = cellSize
+        self._cells = {}
+        self._positions = {}
+
+    def cellSize(self) -> float:
+        return self._cellSize
+
+    def cell(self, x: float, y: float) -> typing.Tuple[int, int]:
+        return (math.floor(x / self._cellSize), math.floor(y / self._cellSize))
+
+    def insert(self, key: typing.Any, x: float, y: float) -> None:
+        """ Adds the key, or moves it if it was already inserted. """
+        position = self._positions.get(key, None)
+        if (position != None):
+            if (position == (x, y)):
+                return
+            oldCell = self.cell(position[0], position[1])
+            if (oldCell == self.cell(x, y)):
+                self._positions[key] = (x, y)
+                return
+            self.remove(key)
+
+        self._positions[key] = (x, y)
+        self._cells.setdefault(self.cell(x, y), set()).add(key)
+
+    def remove(self, key: typing.Any) -> None:
+        position = self._positions.pop(key, None)
+        if (position == None):
+            return
+
+        cell = self.cell(position[0], position[1])
+        keys = self._cells[cell]
+        keys.discard(key)
+        if (len(keys) == 0):
+            del self._cells[cell]
+
+    def clear(self) -> None:
+        self._cells = {}
+        self._positions = {}
+
+    def position(self, key: typing.Any) -> typing.Tuple[float, float]:
+        return self._positions.get(key, None)
+
+    def __contains__(self, key: typing.Any) -> bool:
+        return key in self._positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def query(self, left: float, top: float, right: float, bottom: float) -> typing.List[typing.Any]:
+        """ Returns the keys with a position inside the rectangle. """
+        minCell, maxCell = self.cell(left, top), self.cell(right, bottom)
+        cellCount = (maxCell[0] - minCell[0] + 1) * (maxCell[1] - minCell[1] + 1)
+
+        # When zoomed far out the rectangle spans more cells than are occupied, walk the occupied ones instead.
+        if (cellCount > len(self._cells)):
+            cells = [cell for cell in self._cells if minCell[0] <= cell[0] <= maxCell[0] and minCell[1] <= cell[1] <= maxCell[1]]
+        else:
+            cells = [(cellX, cellY) for cellX in range(minCell[0], maxCell[0] + 1) for cellY in range(minCell[1], maxCell[1] + 1) if (cellX, cellY) in self._cells]
+
+        keys = []
+        for cell in cells:
+            for key in self._cells[cell]:
+                x, y = self._positions[key]
+                if (left <= x <= right and top <= y <= bottom):
+                    keys.append(key)
+        return keys
+
+    def nearest(self, x: float, y: float, radius: float, accept: typing.Callable[[typing.Any], bool] = None) -> typing.Any:
+        """ Returns the key closest to (x, y) within radius, optionally only keys accept() returns True for, or None. """
+        closestKey, closestDistance = None, radius * radius
+        for key in self.query(x - radius, y - radius, x + radius, y + radius):
+            keyX, keyY = self._positions[key]
+            distance = (keyX - x) ** 2 + (keyY - y) ** 2
+            if (distance <= closestDistance and (accept == None or accept(key))):
+                closestKey, closestDistance = key, distance
+        return closestKey
+
+    def bounds(self) -> typing.Optional[typing.Tuple[float, float, float, float]]:
+        """ Returns (left, top, right, bottom) of all positions, or None when empty. """
+        if (len(self._positions) == 0):
+            return None
+
+        xs = [position[0] for position in self._positions.values()]
+        ys = [position[1] for position in self._positions.values()]
+        return (min(xs), min(ys), max(xs), max(ys))
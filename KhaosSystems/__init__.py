@@ -1,3 +1,17 @@
-from .KSNodeGraph import KSNodeItem, KSNodeGraph, KSNodeScene, KSNodeInput, KSNodeOutput
+from .KSGraphModel import KSGraph, KSNode, KSNodeInputPort, KSNodeOutputPort, KSNodeBindingPlan
+from .KSGraphBinary import KSGraphBinaryReader, KSGraphBinaryWriter, convertJsonToBinary, convertBinaryToJson
+from .KSSpatialIndex import KSSpatialHash
+from .KSNodeCache import KSNodeResultCache
+from .KSGraphProfiler import KSGraphProfiler, KSNodeProfile
+from .KSGraphExecutor import KSGraphExecutor, KSGraphExecutionPlan
+from .KSGraphCompiler import KSGraphCompiler, KSCompiledGraph
+from .KSGraphJournal import KSGraphJournal
+from .KSGraphAutosave import KSGraphAutosaver
 from .KSCommandInterpreter import KSCommandInterpreter, KSMayaCommandInterpreter, KSEntityHandle, KSMayaEntityHandle
-from .KSBasicTypes import KSVector
\ No newline at end of file
+from .KSBasicTypes import KSVector
+
+# The Qt views are optional, graphs can be loaded and executed headless without PySide2.
+try:
+    from .KSNodeGraph import KSNodeItem, KSNodeGraph, KSNodeScene, KSNodeInput, KSNodeOutput
+except ImportError:
+    pass
\ No newline at end of file
@@ -0,0 +1,31 @@
+import typing
+import string
+import random
+from KhaosSystems import KSNode
+
+class StringConstantNode(KSNode):
+    _title: str = "Sting Constant"
+    _pure: bool = True
+    _inputDefinitions: typing.Dict[str, type] = {"Seed": str}
+    _outputDefinitions: typing.Dict[str, type] = {"String": str, "Int": int}
+
+    def execute(self) -> None:
+        print("StringConstantNode::Execute()")
+
+        alphabet = list(string.ascii_lowercase)
+        
+        # A generator of its own, reseeding the global one would race with other nodes running in parallel.
+        generator = random.Random(self.getInputData("Seed"))
+        randomString = ''.join(alphabet[generator.randint(0, len(alphabet)-1)] for _ in range(16))
+        randomInt = generator.randint(0, 4096)
+
+        self.setOutputData("String", randomString)
+        self.setOutputData("Int", randomInt)
+
+class PrintString(KSNode):
+    _title: str = "Print String"
+    _inputDefinitions: typing.Dict[str, type] = {"String": str}
+
+    def execute(self) -> None:
+        print("PrintString::Execute()")
+        print(self.getInputData("String"))
\ No newline at end of file
@@ -0,0 +1,13 @@
+# Loads and executes a graph without PySide2/QApplication, e.g. on build nodes.
+import sys
+from KhaosSystems import KSGraph, KSGraphExecutor
+from ExampleNodes import StringConstantNode, PrintString
+
+graph = KSGraph()
+graph.addNodeType(StringConstantNode)
+graph.addNodeType(PrintString)
+
+with open(sys.argv[1]) as file:
+    graph.deserializeFromFile(file)
+
+KSGraphExecutor(graph).execute()
\ No newline at end of file